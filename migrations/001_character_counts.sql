@@ -0,0 +1,17 @@
+-- Per-character counts in an indexed side table so character_count filters
+-- no longer parse character_frequency_map for every row.
+CREATE TABLE IF NOT EXISTS string_character_count (
+    string_id VARCHAR NOT NULL REFERENCES string_analysis_record (id) ON DELETE CASCADE,
+    char VARCHAR(1) NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (string_id, char)
+);
+
+CREATE INDEX IF NOT EXISTS ix_string_character_count_char_count
+    ON string_character_count (char, count);
+
+INSERT INTO string_character_count (string_id, char, count)
+SELECT record.id, freq.key, freq.value::integer
+FROM string_analysis_record AS record,
+     json_each_text(record.character_frequency_map) AS freq
+ON CONFLICT DO NOTHING;
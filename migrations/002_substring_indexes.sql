@@ -0,0 +1,13 @@
+-- Index-backed contains / startswith / endswith filters. The prefix / suffix
+-- indexes cover only the first / last 256 characters so that long values fit
+-- in a btree row.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS ix_string_analysis_record_value_trgm
+    ON string_analysis_record USING gin (value gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS ix_string_analysis_record_value_head
+    ON string_analysis_record (left(value, 256) text_pattern_ops);
+
+CREATE INDEX IF NOT EXISTS ix_string_analysis_record_value_tail
+    ON string_analysis_record (left(reverse(value), 256) text_pattern_ops);
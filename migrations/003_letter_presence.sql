@@ -0,0 +1,31 @@
+-- Letter-presence bitmask (bit i = i-th letter of the alphabet) and
+-- vowel/consonant counts, so letter and character-class conditions are a
+-- single predicate instead of an OR-chain of ILIKE scans.
+ALTER TABLE string_analysis_record
+    ADD COLUMN IF NOT EXISTS letter_mask INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS vowel_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS consonant_count INTEGER NOT NULL DEFAULT 0;
+
+UPDATE string_analysis_record AS record
+SET letter_mask = letters.mask,
+    vowel_count = letters.vowels,
+    consonant_count = letters.consonants
+FROM (
+    SELECT id,
+           COALESCE(bit_or(1 << (ascii(freq.key) - 97))
+                    FILTER (WHERE freq.key ~ '^[a-z]$'), 0) AS mask,
+           COALESCE(sum(freq.value::integer)
+                    FILTER (WHERE freq.key ~ '^[aeiou]$'), 0) AS vowels,
+           COALESCE(sum(freq.value::integer)
+                    FILTER (WHERE freq.key ~ '^[b-df-hj-np-tv-z]$'), 0) AS consonants
+    FROM string_analysis_record,
+         json_each_text(character_frequency_map) AS freq
+    GROUP BY id
+) AS letters
+WHERE record.id = letters.id;
+
+CREATE INDEX IF NOT EXISTS ix_string_analysis_record_vowel_count
+    ON string_analysis_record (vowel_count);
+
+CREATE INDEX IF NOT EXISTS ix_string_analysis_record_consonant_count
+    ON string_analysis_record (consonant_count);
@@ -0,0 +1,3 @@
+-- Keyset pagination on (created_at, id).
+CREATE INDEX IF NOT EXISTS ix_string_analysis_record_created_at_id
+    ON string_analysis_record (created_at, id);
@@ -0,0 +1,10 @@
+-- Point lookups and deletes go through the sha256 primary key.
+
+-- Full-value prefix / suffix indexes left by an earlier version of 002; the
+-- head / tail indexes created there replace them.
+DROP INDEX IF EXISTS ix_string_analysis_record_value_prefix;
+DROP INDEX IF EXISTS ix_string_analysis_record_value_suffix;
+
+-- The full-value unique index is redundant with the primary key. Drop it by
+-- hand when VALUE_UNIQUE_INDEX is left off:
+--   DROP INDEX IF EXISTS ix_string_analysis_record_value;
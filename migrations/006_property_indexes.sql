@@ -0,0 +1,12 @@
+-- Indexes for the length / word_count / is_palindrome filters.
+CREATE INDEX IF NOT EXISTS ix_string_analysis_record_length
+    ON string_analysis_record (length);
+
+CREATE INDEX IF NOT EXISTS ix_string_analysis_record_word_count_length
+    ON string_analysis_record (word_count, length);
+
+CREATE INDEX IF NOT EXISTS ix_string_analysis_record_palindrome_length
+    ON string_analysis_record (length) WHERE is_palindrome;
+
+CREATE INDEX IF NOT EXISTS ix_string_analysis_record_palindrome_created_at_id
+    ON string_analysis_record (created_at, id) WHERE is_palindrome;
@@ -0,0 +1,10 @@
+-- Row counts per (length, word_count, is_palindrome), maintained by the
+-- service on every insert and delete. Fill (or reconcile) it with
+-- python -m scripts.rebuild_stats after applying this to an existing table.
+CREATE TABLE IF NOT EXISTS string_analysis_stats (
+    length INTEGER NOT NULL,
+    word_count INTEGER NOT NULL,
+    is_palindrome BOOLEAN NOT NULL,
+    count BIGINT NOT NULL,
+    PRIMARY KEY (length, word_count, is_palindrome)
+);
@@ -0,0 +1,11 @@
+-- Recently deleted strings, read by the columnar engine refresh so deletes
+-- made by one worker also leave the other workers' arrays.
+CREATE TABLE IF NOT EXISTS string_analysis_deleted (
+    id VARCHAR NOT NULL,
+    created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    deleted_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT localtimestamp,
+    PRIMARY KEY (id, created_at)
+);
+
+CREATE INDEX IF NOT EXISTS ix_string_analysis_deleted_deleted_at
+    ON string_analysis_deleted (deleted_at);
@@ -0,0 +1,7 @@
+-- Set once string_analysis_stats is exact: by python -m scripts.rebuild_stats,
+-- or at start-up while string_analysis_record is empty. Aggregates only read
+-- the stats table after that.
+CREATE TABLE IF NOT EXISTS string_analysis_stats_marker (
+    id INTEGER PRIMARY KEY,
+    marked_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT localtimestamp
+);
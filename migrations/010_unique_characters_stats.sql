@@ -0,0 +1,25 @@
+-- unique_characters joins the string_analysis_stats key, so its facet and
+-- filters are answered from the stats table too, and gets an index for
+-- filtered reads of string_analysis_record.
+CREATE INDEX IF NOT EXISTS ix_string_analysis_record_unique_characters
+    ON string_analysis_record (unique_characters);
+
+-- The old counts cannot be split by unique_characters, so they and the marker
+-- are cleared: aggregates scan until python -m scripts.rebuild_stats fills
+-- the table again. Apply together with the code that writes the new key.
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'string_analysis_stats'
+          AND column_name = 'unique_characters'
+    ) THEN
+        DELETE FROM string_analysis_stats_marker;
+        DELETE FROM string_analysis_stats;
+        ALTER TABLE string_analysis_stats
+            ADD COLUMN unique_characters INTEGER NOT NULL,
+            DROP CONSTRAINT string_analysis_stats_pkey,
+            ADD PRIMARY KEY (length, word_count, unique_characters, is_palindrome);
+    END IF;
+END
+$$;
@@ -0,0 +1,64 @@
+"""Compare ``compute_properties`` with the original multi-pass analysis.
+
+Each input is a lower-case, space-separated, non-palindromic string of the
+given size. Sizes are in bytes and can be passed on the command line.
+
+    python -m scripts.bench_analyzer            # 1 KB, 1 MB, 100 MB
+    python -m scripts.bench_analyzer 1024 1048576
+"""
+
+import random
+import sys
+import time
+from collections import Counter
+from hashlib import sha256
+
+from src.analyzer import compute_properties
+
+
+DEFAULT_SIZES = [1024, 1024 * 1024, 100 * 1024 * 1024]
+
+
+def legacy_analysis(string: str) -> dict:
+    """The analysis as ``insert_string`` originally computed it."""
+    return {
+        "id": sha256(string.encode()).hexdigest(),
+        "value": string,
+        "length": len("".join(string.split(" "))),
+        "is_palindrome": (string.lower() == string[::-1].lower()),
+        "unique_characters": len(set(list(string))),
+        "word_count": len(string.split(" ")),
+        "character_frequency_map": dict(Counter(string)),
+    }
+
+
+def make_input(size: int) -> str:
+    rng = random.Random(size)
+    words = ["".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(1, 9))) for _ in range(512)]
+    text = " ".join(rng.choice(words) for _ in range(size // 5 + 1))
+    return text[:size]
+
+
+def bench(func, string: str) -> float:
+    """Return the best-of-N wall time in milliseconds."""
+    rounds = max(1, min(200, 2_000_000 // max(len(string), 1)))
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(string)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print(f"{'size':>12} {'legacy ms':>12} {'single-pass ms':>15} {'speed-up':>9}")
+    for size in sizes:
+        string = make_input(size)
+        legacy = bench(legacy_analysis, string)
+        current = bench(compute_properties, string)
+        print(f"{size:>12} {legacy:>12.3f} {current:>15.3f} {legacy / current:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Benchmark the columnar engine on synthetic rows, optionally against SQL.
+
+For each row count a ``ColumnarEngine`` is filled with random properties
+(no database needed) and every filter in ``FILTERS`` is timed twice: fetching
+the first page of keys, as the endpoints do, and a full scan counting every
+match, which is the worst case of a selective filter. With ``--sql`` the same
+filters are also run through ``get_strings_by_condition`` with the engine
+off, against whatever the configured database holds.
+
+Memory is roughly 150 bytes per row, so 10M rows need about 1.5 GB.
+
+    python -m scripts.bench_columnar [--rows 1000000,10000000] [--sql]
+"""
+
+import asyncio
+import sys
+import time
+from datetime import datetime
+
+from src import columnar
+from src.conditions import plan_conditions
+from src.string_analysis import page_size
+
+np = columnar.np
+
+FILTERS = [
+    {"is_palindrome": True},
+    {"min_length": 10, "max_length": 20},
+    {"word_count": 2, "min_length": 8},
+    {"contains_character": "z"},
+    {"character_count": "a:2"},
+    {"min_character_count": "e:3,o:3"},
+    {"is_palindrome": True, "min_character_count": "q:2"},
+]
+
+CHUNK = 1000000
+
+
+def synthetic_engine(rows: int, seed: int = 0) -> columnar.ColumnarEngine:
+    rng = np.random.default_rng(seed)
+    engine = columnar.ColumnarEngine()
+    engine.store = columnar.ColumnarStore(capacity=rows)
+    start = columnar.to_micros(datetime(2024, 1, 1))
+    for lo in range(0, rows, CHUNK):
+        count = min(CHUNK, rows - lo)
+        counts = rng.poisson(0.4, size=(count, 26)).astype(np.uint16)
+        length = counts.sum(axis=1, dtype=np.int32) + rng.integers(0, 4, count, dtype=np.int32)
+        vowels = counts[:, [0, 4, 8, 14, 20]].sum(axis=1, dtype=np.int32)
+        engine.store.append(
+            {
+                "created_at": start + np.arange(lo, lo + count, dtype=np.int64),
+                "id": np.char.encode(np.char.zfill(np.arange(lo, lo + count).astype(str), 64)),
+                "is_palindrome": rng.random(count) < 0.01,
+                "counts": counts,
+                "length": length,
+                "word_count": rng.integers(1, 5, count, dtype=np.int32),
+                "unique_characters": (counts > 0).sum(axis=1, dtype=np.int32),
+                "vowel_count": vowels,
+                "consonant_count": length - vowels,
+            }
+        )
+    engine.store.sorted_size = engine.store.size
+    return engine
+
+
+def timed(fn, repeat: int = 3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_engine(rows: int):
+    start = time.perf_counter()
+    engine = synthetic_engine(rows)
+    print(f"== columnar, {rows:,} rows (built in {time.perf_counter() - start:.1f}s)")
+    store = engine.store
+    limit = page_size(None)
+    for conditions in FILTERS:
+        predicate = columnar.compile_node(plan_conditions(conditions))
+        page_s, keys = timed(lambda: engine.select(predicate, limit + 1))
+        scan_s, matches = timed(
+            lambda: int((predicate(store.view(0, store.size)) & store.view(0, store.size)["alive"]).sum())
+        )
+        print(
+            f"   {str(conditions):45} first page {page_s * 1000:8.2f} ms"
+            f"   full scan {scan_s * 1000:8.2f} ms   {matches:>10,} matches"
+        )
+
+
+async def bench_sql():
+    from src.db import AsyncSessionMaker, async_engine
+    from src.string_service import StringAnalysis
+
+    columnar.engine = None
+    limit = page_size(None)
+    print("== SQL (configured database)")
+    for conditions in FILTERS:
+        best = None
+        for _ in range(3):
+            async with AsyncSessionMaker() as session:
+                start = time.perf_counter()
+                rows, _ = await StringAnalysis(session).get_strings_by_condition(
+                    conditions, limit
+                )
+                elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"   {str(conditions):45} first page {best * 1000:8.2f} ms   {len(rows)} rows")
+    await async_engine.dispose()
+
+
+def main(argv: list) -> int:
+    if np is None:
+        print("NumPy is required: poetry install --extras columnar")
+        return 1
+    rows = [1000000, 10000000]
+    if "--rows" in argv:
+        rows = [int(value) for value in argv[argv.index("--rows") + 1].split(",")]
+    for count in rows:
+        bench_engine(count)
+    if "--sql" in argv:
+        asyncio.run(bench_sql())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,52 @@
+"""Per-query latency of number-word normalization.
+
+Compares the built-in ``normalize_numbers`` used by ``preprocess_query``
+with ``numerizer.numerize`` (if it is installed) over a set of typical
+natural-language queries.
+
+    python -m scripts.bench_number_words
+"""
+
+import time
+
+from src.number_words import normalize_numbers
+
+
+QUERIES = [
+    "all single word palindromic strings",
+    "strings longer than ten characters",
+    "strings between three and seven characters",
+    "palindromic strings that contain the first vowel",
+    "strings containing the twenty-first letter",
+    "strings with length at least one hundred twelve characters",
+    "strings shorter than five words and strings containing z",
+    "strings having b in the third position",
+]
+
+
+def bench(func, rounds: int = 2000) -> float:
+    """Return the mean latency per query in microseconds."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for query in QUERIES:
+            func(query)
+    elapsed = time.perf_counter() - start
+    return elapsed / (rounds * len(QUERIES)) * 1e6
+
+
+def main():
+    results = {"normalize_numbers": bench(normalize_numbers)}
+
+    try:
+        from numerizer import numerize
+    except ImportError:
+        print("numerizer not installed -- skipping the baseline")
+    else:
+        results["numerizer.numerize"] = bench(numerize, rounds=50)
+
+    for name, micros in results.items():
+        print(f"{name:<20} {micros:10.2f} us/query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Serialize a list response through the Pydantic models and the fast path.
+
+Checks that both produce byte-identical JSON, then reports the time per
+response for 10k rows (or the row count given on the command line).
+
+    python -m scripts.bench_serialization [rows]
+"""
+
+import sys
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from src.analyzer import analyze_string
+from src.schema import ReturnString, ReturnStringList, encode_string_list
+
+
+def make_records(count: int) -> list:
+    records = []
+    for index in range(count):
+        row = analyze_string(f"sample string number {index} for serialization")
+        records.append(SimpleNamespace(**row, created_at=datetime(2025, 8, 27, 10, 0, index % 60)))
+    return records
+
+
+def model_path(records) -> bytes:
+    return ReturnStringList(
+        return_list=[ReturnString(orm_string=record) for record in records],
+        next_cursor=None,
+    ).model_dump_json().encode()
+
+
+def fast_path(records) -> bytes:
+    return encode_string_list(records)
+
+
+def bench(func, records, rounds: int = 5) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(records)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    records = make_records(count)
+
+    if model_path(records) != fast_path(records):
+        print("Outputs differ")
+        sys.exit(1)
+
+    model_ms = bench(model_path, records)
+    fast_ms = bench(fast_path, records)
+    print(f"{count} rows")
+    print(f"ReturnStringList   {model_ms:9.2f} ms")
+    print(f"encode_string_list {fast_ms:9.2f} ms  ({model_ms / fast_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
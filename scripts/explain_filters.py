@@ -0,0 +1,120 @@
+"""Run EXPLAIN on the standard filter shapes and check the indexes they use.
+
+Each entry in ``REST_FILTERS`` goes through ``filter_query_by_conditions`` and
+each entry in ``NL_QUERIES`` through ``compile_natural_lang``, and is paired
+with the indexes expected to serve it. The bare ``WHERE`` is explained,
+without the keyset ``ORDER BY created_at, id LIMIT``: with that ordering the
+planner can always walk ``ix_string_analysis_record_created_at_id`` and apply
+any predicate as a Filter, which proves nothing about the predicate itself.
+
+On a small development table the planner prefers sequential scans, so pass
+``--no-seqscan`` to check that an index *can* serve every shape; the script
+then exits non-zero if any plan uses none of its expected indexes.
+``--paginated`` explains the statements exactly as the endpoints send them
+instead, for reading only.
+
+    python -m scripts.explain_filters [--no-seqscan] [--analyze] [--paginated]
+"""
+
+import asyncio
+import re
+import sys
+
+from sqlalchemy import select
+
+from src.db import async_engine
+from src.model import StringRecord
+from src.conditions import filter_query_by_conditions
+from src.string_analysis import page_size, paginate
+from src.string_service import compile_natural_lang
+
+
+PALINDROME = {
+    "ix_string_analysis_record_palindrome_length",
+    "ix_string_analysis_record_palindrome_created_at_id",
+}
+LENGTH = {"ix_string_analysis_record_length", "ix_string_analysis_record_palindrome_length"}
+WORD_COUNT = {"ix_string_analysis_record_word_count_length"}
+CHAR_COUNT = {"ix_string_character_count_char_count"}
+TRIGRAM = {"ix_string_analysis_record_value_trgm"}
+
+REST_FILTERS = [
+    ({"is_palindrome": True}, PALINDROME),
+    ({"is_palindrome": True, "max_length": 10}, PALINDROME),
+    ({"min_length": 10}, LENGTH),
+    ({"min_length": 5, "max_length": 20}, LENGTH),
+    ({"word_count": 2}, WORD_COUNT),
+    ({"word_count": 1, "min_length": 8}, WORD_COUNT),
+    ({"min_word_count": 2, "max_word_count": 4, "max_length": 40}, WORD_COUNT),
+    ({"unique_characters": 3}, {"ix_string_analysis_record_unique_characters"}),
+    ({"contains_character": "z"}, CHAR_COUNT),
+    ({"contains_character": "ing"}, TRIGRAM),
+    ({"startswith": "ab"}, {"ix_string_analysis_record_value_head"}),
+    ({"endswith": "ing"}, {"ix_string_analysis_record_value_tail"}),
+    ({"character_count": "a:2"}, CHAR_COUNT),
+    ({"min_character_count": "e:3"}, CHAR_COUNT),
+]
+
+NL_QUERIES = [
+    ("all single word palindromic strings", PALINDROME | WORD_COUNT),
+    ("strings longer than 10 characters", LENGTH),
+    ("strings containing letter z", CHAR_COUNT),
+    ("strings between 3 and 7 characters", LENGTH),
+    ("5 characters palindromic strings", PALINDROME | LENGTH),
+    ("strings without containing vowels", {"ix_string_analysis_record_vowel_count"}),
+    ("strings containing the 2nd consonant", {"ix_string_analysis_record_consonant_count"}),
+]
+
+INDEX_NAME = re.compile(r"(?:Index(?: Only)? Scan|Bitmap Index Scan) (?:using |on )(\w+)")
+
+
+def statements():
+    for conditions, expected in REST_FILTERS:
+        stmt = select(StringRecord).where(*filter_query_by_conditions(conditions))
+        yield f"GET /strings {conditions}", stmt, expected
+    for query, expected in NL_QUERIES:
+        _, stmt = compile_natural_lang(query)
+        yield f"NL {query!r}", stmt, expected
+
+
+async def main(no_seqscan: bool, analyze: bool, paginated: bool) -> int:
+    explain = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+    missing = total = 0
+    limit = page_size(None)
+    async with async_engine.connect() as conn:
+        if no_seqscan:
+            await conn.exec_driver_sql("SET enable_seqscan = off")
+        for label, stmt, expected in statements():
+            if paginated:
+                stmt = paginate(stmt, limit, None)
+            sql = str(
+                stmt.compile(
+                    dialect=async_engine.dialect,
+                    compile_kwargs={"literal_binds": True},
+                )
+            )
+            plan = "\n".join(
+                row[0] for row in await conn.exec_driver_sql(explain + sql)
+            )
+            indexes = sorted(set(INDEX_NAME.findall(plan)))
+            ok = bool(expected & set(indexes))
+            total += 1
+            missing += not ok
+            print(f"== {label}")
+            print(
+                f"   indexes: {', '.join(indexes) or '-'}"
+                f"{'' if ok else '  [EXPECTED ' + ' or '.join(sorted(expected)) + ']'}"
+            )
+            print("   " + plan.replace("\n", "\n   "))
+    await async_engine.dispose()
+
+    print(f"{missing} of {total} plans use none of their expected indexes")
+    return 1 if no_seqscan and not paginated and missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(
+        asyncio.run(
+            main("--no-seqscan" in sys.argv, "--analyze" in sys.argv, "--paginated" in sys.argv)
+        )
+    )
@@ -0,0 +1,57 @@
+"""Apply the SQL files in ``migrations/`` in order.
+
+New tables are created by ``Base.metadata.create_all`` on start-up, but
+columns, indexes and backfills on existing tables are not. Each file runs in
+its own transaction and is recorded in ``schema_migrations``, so later runs
+apply only new files. The migrations are also idempotent, so a database
+migrated before that table existed can safely run them all once more.
+
+    python -m scripts.migrate
+"""
+
+import asyncio
+from pathlib import Path
+
+import asyncpg
+
+from src.config import settings
+
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+CREATE_LEDGER = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    name VARCHAR PRIMARY KEY,
+    applied_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT localtimestamp
+)
+"""
+
+
+async def main():
+    conn = await asyncpg.connect(
+        user=settings.DB_USERNAME,
+        password=settings.DB_PASSWORD,
+        host=settings.DB_HOST,
+        port=settings.DB_PORT,
+        database=settings.DB_NAME,
+    )
+    try:
+        await conn.execute(CREATE_LEDGER)
+        applied = {
+            row["name"] for row in await conn.fetch("SELECT name FROM schema_migrations")
+        }
+        for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+            if path.name in applied:
+                continue
+            print(f"Applying {path.name}")
+            async with conn.transaction():
+                await conn.execute(path.read_text())
+                await conn.execute(
+                    "INSERT INTO schema_migrations (name) VALUES ($1)", path.name
+                )
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
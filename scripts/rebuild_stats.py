@@ -0,0 +1,73 @@
+"""Recompute string_analysis_stats from string_analysis_record.
+
+The stats table is updated by every insert and delete that goes through the
+service, so it only drifts when rows are changed around it (manual SQL,
+restores, or a table that existed before the stats table did). The rebuild
+holds a SHARE lock on string_analysis_record while it counts, which blocks
+writes (not reads) for the duration, and then marks the table exact so
+aggregates start reading it. ``--check`` only reports the drift.
+
+    python -m scripts.rebuild_stats [--check]
+"""
+
+import asyncio
+import sys
+
+from sqlalchemy import delete, func, insert, select, text
+
+from src.db import async_engine
+from src.model import StringRecord, StringStats
+from src.string_analysis import STATS_COLUMNS, mark_stats, stats_marked_query
+
+
+async def main(check: bool) -> int:
+    record_keys = [getattr(StringRecord, name) for name in STATS_COLUMNS]
+    stats_keys = [getattr(StringStats, name) for name in STATS_COLUMNS]
+
+    async with async_engine.begin() as conn:
+        if not check:
+            await conn.execute(text("LOCK TABLE string_analysis_record IN SHARE MODE"))
+        actual = {
+            tuple(row[:-1]): row[-1]
+            for row in await conn.execute(
+                select(*record_keys, func.count()).group_by(*record_keys)
+            )
+        }
+        stored = {
+            tuple(row[:-1]): row[-1]
+            for row in await conn.execute(
+                select(*stats_keys, StringStats.count).where(StringStats.count != 0)
+            )
+        }
+
+        drift = sorted(
+            key for key in actual.keys() | stored.keys()
+            if actual.get(key, 0) != stored.get(key, 0)
+        )
+        for key in drift[:20]:
+            print(f"   {dict(zip(STATS_COLUMNS, key))}: stored {stored.get(key, 0)}, actual {actual.get(key, 0)}")
+        print(
+            f"{len(drift)} of {len(actual)} buckets drifted; "
+            f"stored total {sum(stored.values())}, actual total {sum(actual.values())}"
+        )
+        marked = (await conn.execute(stats_marked_query())).scalar()
+        print(f"Marked exact: {'yes' if marked else 'no'}")
+
+        if not check:
+            await conn.execute(delete(StringStats))
+            if actual:
+                await conn.execute(
+                    insert(StringStats),
+                    [
+                        dict(zip(STATS_COLUMNS, key), count=count)
+                        for key, count in sorted(actual.items())
+                    ],
+                )
+            await conn.execute(mark_stats())
+            print(f"Rebuilt {len(actual)} buckets")
+    await async_engine.dispose()
+    return 1 if check and drift else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main("--check" in sys.argv)))
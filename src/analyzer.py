@@ -0,0 +1,150 @@
+import asyncio
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from hashlib import sha256
+from typing import Optional
+
+from src.config import settings
+from src.log import info_log
+from src.string_analysis import letter_mask, VOWELS, CONSONANTS
+
+
+# Slices used to hash and palindrome-check long strings without copying them
+# whole: each step only allocates a CHUNK-sized piece.
+CHUNK = 64 * 1024
+
+
+class StringProperties:
+    """Stored properties of one string, as computed by ``compute_properties``."""
+
+    __slots__ = (
+        "id",
+        "value",
+        "length",
+        "is_palindrome",
+        "unique_characters",
+        "word_count",
+        "character_frequency_map",
+        "letter_mask",
+        "vowel_count",
+        "consonant_count",
+    )
+
+    def __init__(self, value: str, digest: str, is_palindrome: bool, frequency: dict):
+        spaces = frequency.get(" ", 0)
+        self.id = digest
+        self.value = value
+        self.length = len(value) - spaces
+        self.is_palindrome = is_palindrome
+        self.unique_characters = len(frequency)
+        self.word_count = spaces + 1
+        self.character_frequency_map = frequency
+        self.letter_mask = letter_mask(frequency)
+        self.vowel_count = sum(frequency.get(c, 0) for c in VOWELS)
+        self.consonant_count = sum(frequency.get(c, 0) for c in CONSONANTS)
+
+    def as_row(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def string_id(string: str) -> str:
+    """Primary key of ``string``: the hex sha256 of its UTF-8 bytes."""
+    digest = sha256()
+    for start in range(0, len(string), CHUNK):
+        digest.update(string[start : start + CHUNK].encode())
+    return digest.hexdigest()
+
+
+def _is_palindrome(string: str) -> bool:
+    """Case-insensitive palindrome check that stops at the first mismatch.
+
+    Lower-casing is only per-character for ASCII, so other strings keep the
+    exact whole-string comparison.
+    """
+    if not string.isascii():
+        return string.lower() == string[::-1].lower()
+
+    end = len(string)
+    for start in range(0, end // 2, CHUNK):
+        stop = min(start + CHUNK, end // 2)
+        head = string[start:stop].lower()
+        tail = string[end - stop : end - start].lower()
+        if head != tail[::-1]:
+            return False
+    return True
+
+
+def compute_properties(string: str) -> StringProperties:
+    """Analyze ``string`` with one counting pass plus chunked hash/palindrome scans.
+
+    Length, word count and unique characters all follow from the frequency
+    map (words are separated by single spaces), so the string is never split,
+    joined or copied whole.
+    """
+    return StringProperties(
+        string, string_id(string), _is_palindrome(string), dict(Counter(string))
+    )
+
+
+def analyze_string(string: str) -> dict:
+    """Compute the stored properties of ``string`` as a StringRecord row."""
+    return compute_properties(string).as_row()
+
+
+def analyze_strings(strings: list) -> list:
+    return [analyze_string(string) for string in strings]
+
+
+def character_count_rows(string_data: dict) -> list:
+    return [
+        {"string_id": string_data["id"], "char": char, "count": count}
+        for char, count in string_data["character_frequency_map"].items()
+    ]
+
+
+# --- Off-loop execution ---
+# Inputs of at least ANALYSIS_OFFLOAD_MIN_LENGTH characters (per string, or
+# per batch in total) are analyzed in a process pool so one huge string does
+# not stall every other request on the event loop.
+
+_pool: Optional[ProcessPoolExecutor] = None
+_workers = 1
+
+
+@asynccontextmanager
+async def analysis_pool_lifespan():
+    global _pool, _workers
+    _workers = settings.ANALYSIS_WORKERS or os.cpu_count() or 1
+    _pool = ProcessPoolExecutor(max_workers=_workers)
+    info_log.info(f"Started analysis pool with {_workers} workers")
+    try:
+        yield
+    finally:
+        pool, _pool = _pool, None
+        pool.shutdown(cancel_futures=True)
+        info_log.info("Stopped analysis pool")
+
+
+async def analyze(string: str) -> dict:
+    if _pool is None or len(string) < settings.ANALYSIS_OFFLOAD_MIN_LENGTH:
+        return analyze_string(string)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool, analyze_string, string)
+
+
+async def analyze_many(strings: list) -> list:
+    """Analyze a batch, fanned out in one slice per pool worker when it is large."""
+    if _pool is None or sum(map(len, strings)) < settings.ANALYSIS_OFFLOAD_MIN_LENGTH:
+        return analyze_strings(strings)
+
+    size = -(-len(strings) // _workers)
+    loop = asyncio.get_running_loop()
+    slices = await asyncio.gather(
+        *(
+            loop.run_in_executor(_pool, analyze_strings, strings[start : start + size])
+            for start in range(0, len(strings), size)
+        )
+    )
+    return [row for rows in slices for row in rows]
@@ -0,0 +1,184 @@
+import itertools
+import sys
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+def default_sizeof(key: Hashable, value: Any) -> int:
+    return sys.getsizeof(key) + sys.getsizeof(value)
+
+
+class LRUCache:
+    """Bounded in-process LRU cache with an optional TTL and memory cap.
+
+    Entries are evicted least-recently-used first once either ``max_entries``
+    or ``max_bytes`` (as measured by ``sizeof``) is exceeded. Expired entries
+    are dropped lazily when they are looked up.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Hashable, Any], int] = default_sizeof,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._data: "OrderedDict[Hashable, tuple[Optional[float], int, Any]]" = (
+            OrderedDict()
+        )
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, _, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        size = self.sizeof(key, value)
+
+        if key in self._data:
+            self._remove(key)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        self._data[key] = (expires_at, size, value)
+        self.current_bytes += size
+
+        while len(self._data) > self.max_entries or (
+            self.max_bytes is not None and self.current_bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> Any:
+        if key not in self._data:
+            return None
+        return self._remove(key)
+
+    def clear(self):
+        self._data.clear()
+        self.current_bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._data),
+            "bytes": self.current_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _remove(self, key: Hashable) -> Any:
+        _, size, value = self._data.pop(key)
+        self.current_bytes -= size
+        return value
+
+
+class CacheBackend(ABC):
+    """Async key/value interface behind the point-lookup cache.
+
+    ``MemoryBackend`` keeps entries in this worker. A backend shared by all
+    workers (Redis, memcached, ...) can be dropped in by implementing these
+    methods and assigning it to ``src.string_service.string_cache``.
+
+    Every ``delete_many`` changes the generation of its keys. A reader takes
+    ``generation(key)`` before reading the database and passes it to ``set``,
+    which then skips the write if the key was invalidated in between, so a
+    value read before a delete cannot be cached after it.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def generation(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    async def set(
+        self,
+        key: str,
+        value: bytes,
+        ttl: Optional[float] = None,
+        generation: Optional[int] = None,
+    ):
+        ...
+
+    @abstractmethod
+    async def delete_many(self, keys):
+        ...
+
+    def stats(self) -> dict:
+        return {}
+
+
+class MemoryBackend(CacheBackend):
+    def __init__(self, cache: LRUCache):
+        self.cache = cache
+        # Generations of recently invalidated keys, oldest first and bounded
+        # like the cache. A key without one reads as the newest generation
+        # dropped from here, so a generation taken before an invalidation
+        # never matches again even after the key is dropped.
+        self.generations: "OrderedDict[str, int]" = OrderedDict()
+        self.dropped_generation = 0
+        self._next_generation = itertools.count(1)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self.cache.get(key)
+
+    async def generation(self, key: str) -> int:
+        return self.generations.get(key, self.dropped_generation)
+
+    async def set(
+        self,
+        key: str,
+        value: bytes,
+        ttl: Optional[float] = None,
+        generation: Optional[int] = None,
+    ):
+        if generation is not None and generation != await self.generation(key):
+            return
+        self.cache.set(key, value, ttl=ttl)
+
+    async def delete_many(self, keys):
+        for key in keys:
+            self.cache.pop(key)
+            self.generations.pop(key, None)
+            self.generations[key] = next(self._next_generation)
+        while len(self.generations) > self.cache.max_entries:
+            _, self.dropped_generation = self.generations.popitem(last=False)
+
+    def stats(self) -> dict:
+        return self.cache.stats()
@@ -0,0 +1,418 @@
+"""Optional in-process columnar copy of the filterable string properties.
+
+With ``COLUMNAR_ENGINE`` on (and NumPy installed) each worker loads length,
+word_count, unique_characters, is_palindrome, the vowel/consonant counts and
+an N x 26 letter-count matrix at start-up. Property filters from
+``GET /strings`` and the natural language endpoint are evaluated on these
+arrays, and only the ids of one page of matches are fetched from Postgres.
+Conditions are compiled from the optimized ``src.conditions`` tree; those
+the arrays cannot answer exactly (substrings, prefixes/suffixes, non-letter
+characters, character positions) fall back to SQL.
+
+Rows are kept sorted by the keyset order ``(created_at, id)`` so a page is
+simply the first matches after the cursor. Rows added since the last query
+sit in an unsorted tail that is merged in before the next evaluation.
+
+The service goes through ``ColumnarEngine.run``, which executes one engine
+call at a time in a worker thread. A full scan, a load batch, or the full
+re-sort forced by rows another worker inserted out of order then stalls
+only the requests waiting on the engine, not the event loop.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func, select
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+from src.config import settings
+from src.log import info_log, error_log
+from src import conditions
+from src.model import StringRecord, DeletedString
+from src.string_analysis import LETTERS
+
+
+# Letter counts are stored as uint16; thresholds at or above this saturate
+# and are left to SQL.
+MAX_COUNT = 65535
+
+# Rows evaluated per step while looking for one page of matches, so early
+# pages of unselective filters do not scan the whole table.
+SCAN_CHUNK = 256 * 1024
+
+LOAD_BATCH = 50000
+
+_EPOCH = datetime(1970, 1, 1)
+_LETTER_INDEX = {letter: index for index, letter in enumerate(LETTERS)}
+
+_INT_COLUMNS = (
+    "length",
+    "word_count",
+    "unique_characters",
+    "vowel_count",
+    "consonant_count",
+)
+
+
+def to_micros(value: datetime) -> int:
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def from_micros(value: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=int(value))
+
+
+class Unsupported(Exception):
+    """Raised while compiling a condition the arrays cannot answer exactly."""
+
+
+# --- Condition compilation: each predicate maps a column view to a mask ---
+
+def _column(field: str):
+    if field == "letters":
+        return lambda view: view["vowel_count"] + view["consonant_count"]
+    if field not in _INT_COLUMNS:
+        raise Unsupported(field)
+    return lambda view: view[field]
+
+
+def _bounded(column, lo, hi):
+    if lo is not None and lo == hi:
+        return lambda view: column(view) == lo
+    if hi is None:
+        return lambda view: column(view) >= lo
+    if lo is None:
+        return lambda view: column(view) <= hi
+    return lambda view: (column(view) >= lo) & (column(view) <= hi)
+
+
+def compile_node(node):
+    """Predicate for an optimized ``src.conditions`` node, None for "no
+    filter". Raises ``Unsupported`` for substring and position tests and for
+    characters other than letters."""
+    if isinstance(node, conditions.Const):
+        if node.value:
+            return None
+        return lambda view: np.zeros(len(view["alive"]), dtype=bool)
+    if isinstance(node, conditions.And):
+        predicates = [compile_node(child) for child in node.children]
+        return lambda view: np.logical_and.reduce([p(view) for p in predicates])
+    if isinstance(node, conditions.Or):
+        predicates = [compile_node(child) for child in node.children]
+        return lambda view: np.logical_or.reduce([p(view) for p in predicates])
+    if isinstance(node, conditions.Not):
+        predicate = compile_node(node.child)
+        return lambda view: ~predicate(view)
+
+    if isinstance(node, conditions.Range):
+        return _bounded(_column(node.field), node.lo, node.hi)
+    if isinstance(node, conditions.Flag) and node.field == "is_palindrome":
+        return lambda view: view["is_palindrome"]
+    if isinstance(node, conditions.CharCount):
+        index = _LETTER_INDEX.get(node.char)
+        if index is None or max(node.lo, node.hi or 0) >= MAX_COUNT:
+            raise Unsupported(node.char)
+        return _bounded(lambda view: view["counts"][:, index], node.lo, node.hi)
+    raise Unsupported(type(node).__name__)
+
+
+class ColumnarStore:
+    """Growable column arrays in keyset order plus an unsorted tail."""
+
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.sorted_size = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        old = getattr(self, "columns", None)
+        columns = {
+            "created_at": np.empty(capacity, dtype=np.int64),
+            "id": np.empty(capacity, dtype="S64"),
+            "alive": np.zeros(capacity, dtype=bool),
+            "is_palindrome": np.empty(capacity, dtype=bool),
+            "counts": np.empty((capacity, 26), dtype=np.uint16),
+        }
+        for name in _INT_COLUMNS:
+            columns[name] = np.empty(capacity, dtype=np.int32)
+        if old is not None:
+            for name, array in old.items():
+                columns[name][: self.size] = array[: self.size]
+        self.columns = columns
+        self.capacity = capacity
+
+    def append(self, rows: dict):
+        """Append a batch given as equal-length arrays, one per column."""
+        count = len(rows["id"])
+        if self.size + count > self.capacity:
+            self._allocate(max(self.capacity * 2, self.size + count))
+        end = self.size + count
+        for name, array in rows.items():
+            self.columns[name][self.size : end] = array
+        self.columns["alive"][self.size : end] = True
+        self.size = end
+
+    def merge(self):
+        """Sort the tail into place. New rows are almost always later than
+        everything already sorted, in which case only the tail is sorted."""
+        lo, hi = self.sorted_size, self.size
+        if lo == hi:
+            return
+        created, ids = self.columns["created_at"], self.columns["id"]
+        order = np.lexsort((ids[lo:hi], created[lo:hi])) + lo
+        first = order[0]
+        if lo and (created[first], ids[first]) <= (created[lo - 1], ids[lo - 1]):
+            order, lo = np.lexsort((ids[:hi], created[:hi])), 0
+        for array in self.columns.values():
+            array[lo:hi] = array[order]
+        self.sorted_size = hi
+
+    def view(self, lo: int, hi: int) -> dict:
+        return {name: array[lo:hi] for name, array in self.columns.items()}
+
+    def position_after(self, after) -> int:
+        """Index of the first row strictly after the ``(created_at, id)`` key."""
+        if after is None:
+            return 0
+        created_at, record_id = after
+        created = self.columns["created_at"][: self.size]
+        key = to_micros(created_at)
+        lo = int(np.searchsorted(created, key, side="left"))
+        hi = int(np.searchsorted(created, key, side="right"))
+        ids = self.columns["id"][lo:hi]
+        return lo + int(np.searchsorted(ids, record_id.encode(), side="right"))
+
+    def find(self, created_at: datetime, record_id: str) -> Optional[int]:
+        created = self.columns["created_at"]
+        key = to_micros(created_at)
+        encoded = record_id.encode()
+        lo = int(np.searchsorted(created[: self.sorted_size], key, side="left"))
+        hi = int(np.searchsorted(created[: self.sorted_size], key, side="right"))
+        for index in range(lo, hi):
+            if self.columns["id"][index] == encoded:
+                return index
+        for index in range(self.sorted_size, self.size):
+            if created[index] == key and self.columns["id"][index] == encoded:
+                return index
+        return None
+
+
+class ColumnarEngine:
+    def __init__(self):
+        self.store = ColumnarStore()
+        # Newest created_at loaded from the database, for delta refreshes.
+        self.watermark: Optional[datetime] = None
+        # Database time up to which string_analysis_deleted has been read.
+        self.deleted_since: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+
+    async def run(self, method, *args):
+        """Call ``method`` (one of the engine's own) in a worker thread,
+        serialized with every other call. Shielded, so a cancelled request
+        cannot release the lock while the thread is still using the arrays."""
+        return await asyncio.shield(self._run(method, *args))
+
+    async def _run(self, method, *args):
+        async with self._lock:
+            return await asyncio.to_thread(method, *args)
+
+    def __len__(self):
+        return int(self.store.columns["alive"][: self.store.size].sum())
+
+    # --- Maintenance ---
+
+    def add_rows(self, rows: list):
+        """Add analyzed rows (dicts with the StringRecord columns, including
+        created_at) that are not stored yet."""
+        if not rows:
+            return
+        counts = np.zeros((len(rows), 26), dtype=np.uint16)
+        for row_index, row in enumerate(rows):
+            for char, count in row["character_frequency_map"].items():
+                index = _LETTER_INDEX.get(char)
+                if index is not None:
+                    counts[row_index, index] = min(count, MAX_COUNT)
+        batch = {
+            "created_at": np.array([to_micros(row["created_at"]) for row in rows], dtype=np.int64),
+            "id": np.array([row["id"].encode() for row in rows], dtype="S64"),
+            "is_palindrome": np.array([row["is_palindrome"] for row in rows], dtype=bool),
+            "counts": counts,
+        }
+        for name in _INT_COLUMNS:
+            batch[name] = np.array([row[name] for row in rows], dtype=np.int32)
+        self.store.append(batch)
+
+    def remove(self, created_at: datetime, record_id: str):
+        index = self.store.find(created_at, record_id)
+        if index is not None:
+            self.store.columns["alive"][index] = False
+
+    def _remove_many(self, keys: list):
+        for record_id, created_at in keys:
+            self.remove(created_at, record_id)
+
+    # --- Queries ---
+
+    def select(self, predicate, count: int, after=None) -> list:
+        """Return up to ``count`` ``(created_at, id)`` keys of live rows
+        matching ``predicate`` (None matches everything) after ``after``."""
+        store = self.store
+        store.merge()
+        keys = []
+        start = store.position_after(after)
+        while start < store.size and len(keys) < count:
+            end = min(start + SCAN_CHUNK, store.size)
+            view = store.view(start, end)
+            mask = view["alive"] if predicate is None else predicate(view) & view["alive"]
+            hits = np.flatnonzero(mask)[: count - len(keys)]
+            for index in hits:
+                keys.append(
+                    (from_micros(view["created_at"][index]), view["id"][index].decode())
+                )
+            start = end
+        return keys
+
+    def aggregate(self, predicate, facets=()) -> tuple:
+        """Return ``(count, {facet: {value: count}})`` over the live rows
+        matching ``predicate``; facets are columns such as ``length``."""
+        store = self.store
+        view = store.view(0, store.size)
+        mask = view["alive"] if predicate is None else predicate(view) & view["alive"]
+        histograms = {}
+        for name in facets:
+            values, counts = np.unique(view[name][mask], return_counts=True)
+            histograms[name] = {
+                value.item(): int(count) for value, count in zip(values, counts)
+            }
+        return int(mask.sum()), histograms
+
+    # --- Loading ---
+
+    async def load(self, session, since: Optional[datetime] = None):
+        """Load rows created at or after ``since`` (all rows if None),
+        skipping those already stored. A full load also starts the window
+        read by ``load_deletes``."""
+        if since is None:
+            self.deleted_since = (await session.execute(select(func.localtimestamp()))).scalar()
+        letters = [
+            func.coalesce(StringRecord.character_frequency_map[letter].as_integer(), 0)
+            for letter in LETTERS
+        ]
+        stmt = select(
+            StringRecord.created_at,
+            StringRecord.id,
+            StringRecord.is_palindrome,
+            *(getattr(StringRecord, name) for name in _INT_COLUMNS),
+            *letters,
+        ).order_by(StringRecord.created_at, StringRecord.id)
+        if since is not None:
+            stmt = stmt.where(StringRecord.created_at >= since)
+
+        loaded = 0
+        result = await session.stream(stmt.execution_options(yield_per=LOAD_BATCH))
+        async for rows in result.partitions():
+            loaded += await self.run(self._add_loaded, rows, since is not None)
+        return loaded
+
+    async def load_deletes(self, session, overlap: timedelta) -> bool:
+        """Drop rows deleted (by any worker) since the last call. Returns
+        False, without reading, when the window is older than the retained
+        deletes, in which case only a full reload is exact."""
+        now = (await session.execute(select(func.localtimestamp()))).scalar()
+        since = self.deleted_since - overlap
+        if now - since > timedelta(seconds=settings.COLUMNAR_TOMBSTONE_SECONDS):
+            return False
+        keys = (
+            await session.execute(
+                select(DeletedString.id, DeletedString.created_at).where(
+                    DeletedString.deleted_at >= since
+                )
+            )
+        ).all()
+        if keys:
+            await self.run(self._remove_many, keys)
+        self.deleted_since = now
+        return True
+
+    def _add_loaded(self, rows: list, skip_known: bool) -> int:
+        if skip_known:
+            rows = [row for row in rows if self.store.find(row[0], row[1]) is None]
+            if not rows:
+                return 0
+        width = 3 + len(_INT_COLUMNS)
+        batch = {
+            "created_at": np.array([to_micros(row[0]) for row in rows], dtype=np.int64),
+            "id": np.array([row[1].encode() for row in rows], dtype="S64"),
+            "is_palindrome": np.array([row[2] for row in rows], dtype=bool),
+            "counts": np.minimum(
+                np.array([row[width:] for row in rows], dtype=np.int64), MAX_COUNT
+            ).astype(np.uint16),
+        }
+        for offset, name in enumerate(_INT_COLUMNS, start=3):
+            batch[name] = np.array([row[offset] for row in rows], dtype=np.int32)
+        self.store.append(batch)
+        newest = from_micros(batch["created_at"].max())
+        if self.watermark is None or newest > self.watermark:
+            self.watermark = newest
+        return len(rows)
+
+
+engine: Optional[ColumnarEngine] = None
+
+
+async def _refresh(session_maker):
+    """Pick up rows inserted and deleted by other workers. The windows
+    overlap the last ones because rows become visible when their transaction
+    commits, which can be well after their created_at / deleted_at."""
+    global engine
+    overlap = timedelta(seconds=settings.COLUMNAR_REFRESH_SECONDS * 2)
+    while True:
+        await asyncio.sleep(settings.COLUMNAR_REFRESH_SECONDS)
+        try:
+            since = engine.watermark - overlap if engine.watermark else None
+            async with session_maker() as session:
+                await engine.load(session, since)
+                if await engine.load_deletes(session, overlap):
+                    continue
+            error_log.error("Columnar engine fell behind the retained deletes -- reloading")
+            reloaded = ColumnarEngine()
+            async with session_maker() as session:
+                await reloaded.load(session)
+            engine = reloaded
+        except Exception:
+            error_log.error("Columnar engine refresh failed")
+
+
+@asynccontextmanager
+async def columnar_lifespan():
+    global engine
+    if not settings.COLUMNAR_ENGINE:
+        yield
+        return
+    if np is None:
+        error_log.error("COLUMNAR_ENGINE is on but NumPy is not installed -- using SQL")
+        yield
+        return
+
+    from src import db
+
+    session_maker = db.ReplicaSessionMaker or db.AsyncSessionMaker
+    loading = ColumnarEngine()
+    async with session_maker() as session:
+        loaded = await loading.load(session)
+    engine = loading
+    info_log.info(f"Columnar engine loaded {loaded} rows")
+
+    refresh = asyncio.create_task(_refresh(session_maker))
+    try:
+        yield
+    finally:
+        refresh.cancel()
+        engine = None
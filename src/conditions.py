@@ -0,0 +1,613 @@
+"""Condition IR shared by ``GET /strings`` and the natural language endpoint.
+
+Both front ends lower into the same small tree: ``lower_conditions`` takes
+the REST query parameters and ``lower_parsed`` the ``NLTransformer`` output.
+``optimize`` then folds constants, merges ranges and per-character bounds,
+detects unsatisfiable combinations (answered as ``FALSE`` without touching
+the database) and orders conjunctions by estimated selectivity. ``to_filters``
+generates the SQL, and ``columnar.compile_node`` the in-memory predicate,
+from the optimized tree.
+
+Leaves:
+
+- ``Range(field, lo, hi)``: inclusive integer bounds on a count column, or
+  on ``letters`` (vowel_count + consonant_count). None means unbounded.
+- ``Flag(field)``: a boolean column is true (``is_palindrome``).
+- ``CharCount(char, lo, hi)``: the character occurs, between ``lo`` and
+  ``hi`` times. Like the string_character_count side table it is read from,
+  it never matches strings without the character.
+- ``Contains``, ``Prefix``, ``Suffix``: substring tests on the value.
+- ``CharAt(position, chars)``: the character at 1-based ``position`` (-1 for
+  the last one) is one of ``chars``.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import and_, false, func, or_, true
+
+from src.model import StringRecord
+from src.string_analysis import (
+    VOWELS,
+    CONSONANTS,
+    segregate,
+    count_string,
+    char_class_chars,
+    contains_filter,
+    startswith_filter,
+    endswith_filter,
+    build_char_count_filter,
+)
+
+
+# --- Nodes ---
+
+@dataclass(frozen=True)
+class Const:
+    value: bool
+
+
+TRUE = Const(True)
+FALSE = Const(False)
+
+
+@dataclass(frozen=True)
+class Range:
+    field: str
+    lo: Optional[int] = None
+    hi: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class Flag:
+    field: str
+
+
+@dataclass(frozen=True)
+class CharCount:
+    char: str
+    lo: Optional[int] = 1
+    hi: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class Contains:
+    substring: str
+
+
+@dataclass(frozen=True)
+class Prefix:
+    prefix: str
+
+
+@dataclass(frozen=True)
+class Suffix:
+    suffix: str
+
+
+@dataclass(frozen=True)
+class CharAt:
+    position: int
+    chars: str
+
+
+@dataclass(frozen=True)
+class And:
+    children: tuple
+
+
+@dataclass(frozen=True)
+class Or:
+    children: tuple
+
+
+@dataclass(frozen=True)
+class Not:
+    child: object
+
+
+RANGE_FIELDS = (
+    "length",
+    "word_count",
+    "unique_characters",
+    "vowel_count",
+    "consonant_count",
+    "letters",
+)
+
+# Smallest value each range field can take; word_count is spaces + 1.
+FIELD_MIN = {"word_count": 1}
+
+
+def fields(node) -> set:
+    """Columns ``node`` reads: range and flag fields, ``value`` for the
+    substring tests and ``characters`` for ``CharCount``."""
+    if isinstance(node, (And, Or)):
+        return set().union(*(fields(child) for child in node.children))
+    if isinstance(node, Not):
+        return fields(node.child)
+    if isinstance(node, (Range, Flag)):
+        return {node.field}
+    if isinstance(node, CharCount):
+        return {"characters"}
+    if isinstance(node, Const):
+        return set()
+    return {"value"}
+
+
+# --- Front ends ---
+
+def _combine(sep: str, nodes: list):
+    return Or(tuple(nodes)) if sep == "," else And(tuple(nodes))
+
+
+def _contains(substring: str):
+    if len(substring) == 1:
+        return CharCount(substring)
+    return Contains(substring)
+
+
+def lower_conditions(conditions: dict):
+    """IR for the ``GET /strings`` query parameters. Raises ``ValueError``
+    for malformed character counts."""
+    nodes = []
+
+    if conditions.get("is_palindrome") is True:
+        nodes.append(Flag("is_palindrome"))
+
+    for field in ("length", "word_count", "unique_characters"):
+        exact = conditions.get(field)
+        if isinstance(exact, int):
+            nodes.append(Range(field, exact, exact))
+        low = conditions.get(f"min_{field}")
+        if isinstance(low, int):
+            nodes.append(Range(field, lo=low))
+        high = conditions.get(f"max_{field}")
+        if isinstance(high, int):
+            nodes.append(Range(field, hi=high))
+
+    for key, build in [
+        ("contains_character", _contains),
+        ("startswith", Prefix),
+        ("endswith", Suffix),
+    ]:
+        value = conditions.get(key)
+        if value:
+            value = value.lower()
+            segs = segregate(value)
+            if segs:
+                sep, items = segs
+                nodes.append(_combine(sep, [build(item) for item in items]))
+            else:
+                nodes.append(build(value))
+
+    for key, bounds in [
+        ("character_count", lambda count: (count, count)),
+        ("min_character_count", lambda count: (count, None)),
+        ("max_character_count", lambda count: (None, count)),
+    ]:
+        value = conditions.get(key)
+        if value:
+            segs = segregate(value)
+            sep, items = segs if segs else (None, [value])
+            counts = []
+            for item in items:
+                char, count = count_string(item)
+                counts.append(CharCount(char, *bounds(count)))
+            nodes.append(_combine(sep, counts) if segs else counts[0])
+
+    return And(tuple(nodes))
+
+
+_COMPARISONS = {
+    ">": lambda field, value: Range(field, lo=value + 1),
+    ">=": lambda field, value: Range(field, lo=value),
+    "<": lambda field, value: Range(field, hi=value - 1),
+    "<=": lambda field, value: Range(field, hi=value),
+    "==": lambda field, value: Range(field, value, value),
+    "!=": lambda field, value: Not(Range(field, value, value)),
+}
+
+
+def _class_field(char_class: str) -> str:
+    chars = char_class_chars(char_class)
+    if chars == VOWELS:
+        return "vowel_count"
+    if chars == CONSONANTS:
+        return "consonant_count"
+    return "letters"
+
+
+def _positional(cond: dict):
+    position = cond.get("position")
+    letter, alpha = cond.get("letter"), cond.get("alpha")
+    if position is None or not (letter or alpha):
+        return None
+    chars = letter or char_class_chars(alpha)
+
+    if position == -1:
+        return Suffix(letter) if letter else CharAt(-1, chars)
+    if cond.get("at_position", False):
+        if position == 1 and letter:
+            return Prefix(letter)
+        return CharAt(position, chars)
+    if letter:
+        return CharCount(letter, lo=position)
+    return Range(_class_field(alpha), lo=position)
+
+
+def lower_parsed(cond):
+    """IR for an ``NLTransformer`` condition tree; None for "no filter"."""
+    if not isinstance(cond, dict):
+        return None
+    cond_type = cond.get("type")
+
+    if cond_type == "comparison":
+        field = cond["field"]
+        if field not in RANGE_FIELDS:
+            return None
+        value = cond["value"]
+        if value is None:
+            # Comparing with NULL matches nothing, except "!=" (IS NOT NULL).
+            return TRUE if cond["op"] == "!=" else FALSE
+        return _COMPARISONS.get(cond["op"], _COMPARISONS["=="])(field, value)
+
+    if cond_type == "range":
+        if cond["field"] not in RANGE_FIELDS:
+            return None
+        return Range(cond["field"], cond["min"], cond["max"])
+
+    if cond_type == "contains":
+        subtype = cond.get("subtype")
+        if subtype == "count":
+            if cond["field"] not in RANGE_FIELDS:
+                return None
+            node = Range(cond["field"], lo=cond["value"])
+        elif subtype == "positional":
+            node = _positional(cond)
+            if node is None:
+                return None
+        elif subtype == "char_class":
+            node = Range(_class_field(cond["char_class"]), lo=1)
+        elif subtype == "letter":
+            node = _contains(cond["letter"])
+        else:
+            return None
+        return Not(node) if cond.get("neg", False) else node
+
+    if cond_type == "qualitative":
+        nodes = []
+        if cond["qual"] in ["palindrome", "palindromic"]:
+            nodes.append(Flag("is_palindrome"))
+        for field in ("word_count", "length"):
+            if field in cond:
+                nodes.append(Range(field, cond[field], cond[field]))
+        return And(tuple(nodes)) if nodes else None
+
+    if cond_type == "compound":
+        parts = []
+        for item in cond["conditions"]:
+            if not isinstance(item, dict):
+                continue
+            if "op" in item and "condition" in item:
+                node, op = lower_parsed(item["condition"]), item["op"]
+            else:
+                node, op = lower_parsed(item), "and"
+            if node is not None:
+                parts.append((op, node))
+        if not parts:
+            return None
+        result = parts[0][1]
+        for op, node in parts[1:]:
+            result = Or((result, node)) if op == "or" else And((result, node))
+        return result
+
+    return None
+
+
+# --- Optimizer ---
+
+def _intersect(a: tuple, b: tuple) -> tuple:
+    lo = max((bound for bound in (a[0], b[0]) if bound is not None), default=None)
+    hi = min((bound for bound in (a[1], b[1]) if bound is not None), default=None)
+    return lo, hi
+
+
+def _union(a: tuple, b: tuple) -> Optional[tuple]:
+    """Union of two bounds, or None if they leave a gap."""
+    (a_lo, a_hi), (b_lo, b_hi) = sorted([a, b], key=lambda bound: -1 if bound[0] is None else bound[0])
+    if a_hi is not None and b_lo is not None and b_lo > a_hi + 1:
+        return None
+    hi = None if a_hi is None or b_hi is None else max(a_hi, b_hi)
+    return a_lo, hi
+
+
+def _range(field: str, lo, hi):
+    floor = FIELD_MIN.get(field, 0)
+    if lo is not None and lo <= floor:
+        lo = None
+    if hi is not None and (hi < floor or (lo is not None and hi < lo)):
+        return FALSE
+    if lo is None and hi is None:
+        return TRUE
+    return Range(field, lo, hi)
+
+
+def _char_count(char: str, lo, hi):
+    lo = max(lo or 1, 1)
+    if hi is not None and hi < lo:
+        return FALSE
+    return CharCount(char, lo, hi)
+
+
+def _complement(node: Range):
+    low = _range(node.field, None, node.lo - 1) if node.lo is not None else FALSE
+    high = _range(node.field, node.hi + 1, None) if node.hi is not None else FALSE
+    return optimize(Or((low, high)))
+
+
+def _nonspace(text: str) -> int:
+    return len(text) - text.count(" ")
+
+
+def _merge_and(children: list):
+    """Merge the conjuncts of one ``And``; FALSE if they cannot all hold."""
+    ranges, counts, rest = {}, {}, []
+    prefix = suffix = ""
+    positions = {}
+    for child in children:
+        if isinstance(child, Range):
+            bounds = ranges.get(child.field, (None, None))
+            ranges[child.field] = _intersect(bounds, (child.lo, child.hi))
+        elif isinstance(child, CharCount):
+            bounds = counts.get(child.char, (None, None))
+            counts[child.char] = _intersect(bounds, (child.lo, child.hi))
+        elif isinstance(child, Prefix):
+            short, long = sorted([prefix, child.prefix], key=len)
+            if not long.startswith(short):
+                return FALSE
+            prefix = long
+        elif isinstance(child, Suffix):
+            short, long = sorted([suffix, child.suffix], key=len)
+            if not long.endswith(short):
+                return FALSE
+            suffix = long
+        elif isinstance(child, CharAt):
+            chars = positions.get(child.position, child.chars)
+            positions[child.position] = "".join(c for c in chars if c in child.chars)
+        else:
+            rest.append(child)
+
+    merged = [_range(field, *bounds) for field, bounds in ranges.items()]
+    merged += [_char_count(char, *bounds) for char, bounds in counts.items()]
+    merged += [_char_at(position, chars) for position, chars in positions.items()]
+    if prefix:
+        merged.append(Prefix(prefix))
+    if suffix:
+        merged.append(Suffix(suffix))
+    if FALSE in merged:
+        return FALSE
+    merged = [node for node in merged if node is not TRUE]
+
+    # length counts every character except spaces, so it bounds the other
+    # counts and the non-space characters the substring tests require.
+    length_hi = ranges.get("length", (None, None))[1]
+    if length_hi is not None:
+        needed = [
+            ranges.get(field, (None, None))[0] or 0
+            for field in ("length", "vowel_count", "consonant_count", "letters")
+        ]
+        needed.append(sum(lo or 0 for char, (lo, _) in counts.items() if char != " "))
+        needed.append((ranges.get("unique_characters", (None, None))[0] or 0) - 1)
+        needed += [_nonspace(prefix), _nonspace(suffix)]
+        needed += [_nonspace(node.substring) for node in rest if isinstance(node, Contains)]
+        if max(needed) > length_hi:
+            return FALSE
+
+    negated = {node.child for node in rest if isinstance(node, Not)}
+    if any(node in negated for node in merged + rest):
+        return FALSE
+    return merged + rest
+
+
+def _merge_or(children: list):
+    """Merge the disjuncts of one ``Or``; TRUE if one of them always holds."""
+    ranges, counts, rest = {}, {}, []
+    for child in children:
+        if isinstance(child, Range):
+            ranges.setdefault(child.field, []).append((child.lo, child.hi))
+        elif isinstance(child, CharCount):
+            counts.setdefault(child.char, []).append((child.lo, child.hi))
+        else:
+            rest.append(child)
+
+    merged = []
+    for field, bounds in ranges.items():
+        merged += [_range(field, *b) for b in _coalesce(bounds)]
+    for char, bounds in counts.items():
+        merged += [_char_count(char, *b) for b in _coalesce(bounds)]
+    if TRUE in merged:
+        return TRUE
+
+    negated = {node.child for node in rest if isinstance(node, Not)}
+    if any(node in negated for node in merged + rest):
+        return TRUE
+    return merged + rest
+
+
+def _coalesce(bounds: list) -> list:
+    """Merge overlapping or adjacent bounds."""
+    bounds = sorted(bounds, key=lambda bound: -1 if bound[0] is None else bound[0])
+    result = [bounds[0]]
+    for bound in bounds[1:]:
+        union = _union(result[-1], bound)
+        if union is None:
+            result.append(bound)
+        else:
+            result[-1] = union
+    return result
+
+
+def _char_at(position: int, chars: str):
+    if not chars or (position < 1 and position != -1):
+        return FALSE
+    return CharAt(position, chars)
+
+
+def _unique(nodes: list) -> list:
+    return list(dict.fromkeys(nodes))
+
+
+# Rough fraction of strings a condition matches, used only to order the
+# conjuncts of an And so the most selective come first.
+def selectivity(node) -> float:
+    if isinstance(node, Const):
+        return 1.0 if node.value else 0.0
+    if isinstance(node, Flag):
+        return 0.02
+    if isinstance(node, Range):
+        if node.lo is not None and node.lo == node.hi:
+            return 0.05 if node.field == "length" else 0.2
+        return 0.3 if node.lo is not None and node.hi is not None else 0.5
+    if isinstance(node, CharCount):
+        if node.lo > 1 or node.hi is not None:
+            return 0.1
+        return 0.4
+    if isinstance(node, (Prefix, Suffix, CharAt)):
+        return 0.05
+    if isinstance(node, Contains):
+        return 0.1
+    if isinstance(node, Not):
+        return 1.0 - selectivity(node.child)
+    if isinstance(node, And):
+        result = 1.0
+        for child in node.children:
+            result *= selectivity(child)
+        return result
+    if isinstance(node, Or):
+        return min(1.0, sum(selectivity(child) for child in node.children))
+    return 1.0
+
+
+def optimize(node):
+    """Simplified equivalent of ``node``: ``TRUE`` for no filter, ``FALSE``
+    when nothing can match."""
+    if node is None:
+        return TRUE
+
+    if isinstance(node, (And, Or)):
+        kind = type(node)
+        children = []
+        for child in node.children:
+            child = optimize(child)
+            children += child.children if isinstance(child, kind) else [child]
+
+        absorbing, neutral = (FALSE, TRUE) if kind is And else (TRUE, FALSE)
+        if absorbing in children:
+            return absorbing
+        children = [child for child in children if child != neutral]
+        children = (_merge_and if kind is And else _merge_or)(_unique(children))
+        if isinstance(children, Const):
+            return children
+        children = _unique(children)
+        if not children:
+            return neutral
+        if len(children) == 1:
+            return children[0]
+        if kind is And:
+            children.sort(key=selectivity)
+        return kind(tuple(children))
+
+    if isinstance(node, Not):
+        child = optimize(node.child)
+        if isinstance(child, Const):
+            return FALSE if child.value else TRUE
+        if isinstance(child, Not):
+            return child.child
+        if isinstance(child, Range):
+            return _complement(child)
+        return Not(child)
+
+    if isinstance(node, Range):
+        return _range(node.field, node.lo, node.hi)
+    if isinstance(node, CharCount):
+        return _char_count(node.char, node.lo, node.hi)
+    if isinstance(node, Contains):
+        return TRUE if not node.substring else node
+    if isinstance(node, Prefix):
+        return TRUE if not node.prefix else node
+    if isinstance(node, Suffix):
+        return TRUE if not node.suffix else node
+    if isinstance(node, CharAt):
+        return _char_at(node.position, node.chars)
+    return node
+
+
+# --- SQL generation ---
+
+def _column(model, field: str):
+    if field == "letters":
+        return model.vowel_count + model.consonant_count
+    return getattr(model, field)
+
+
+def to_sql(node, model=StringRecord):
+    """SQL expression for an optimized node. ``model`` may be another table
+    with the same range and flag columns, such as ``StringStats``."""
+    if isinstance(node, Const):
+        return true() if node.value else false()
+    if isinstance(node, And):
+        return and_(*(to_sql(child, model) for child in node.children))
+    if isinstance(node, Or):
+        return or_(*(to_sql(child, model) for child in node.children))
+    if isinstance(node, Not):
+        return ~to_sql(node.child, model)
+
+    if isinstance(node, Range):
+        if node.field == "letters" and node.lo == 1 and node.hi is None:
+            return model.letter_mask != 0
+        column = _column(model, node.field)
+        if node.lo == node.hi:
+            return column == node.lo
+        if node.hi is None:
+            return column >= node.lo
+        if node.lo is None:
+            return column <= node.hi
+        return and_(column >= node.lo, column <= node.hi)
+    if isinstance(node, Flag):
+        # The bare column, not "IS true": the planner only matches the
+        # partial indexes declared WHERE is_palindrome against it.
+        return getattr(model, node.field)
+
+    if isinstance(node, CharCount):
+        return build_char_count_filter(node.char, node.lo, node.hi)
+    if isinstance(node, Contains):
+        return contains_filter(node.substring)
+    if isinstance(node, Prefix):
+        return startswith_filter(node.prefix)
+    if isinstance(node, Suffix):
+        return endswith_filter(node.suffix)
+    if isinstance(node, CharAt):
+        if node.position == -1:
+            char = func.right(StringRecord.value, 1)
+        else:
+            char = func.substr(StringRecord.value, node.position, 1)
+        return char == node.chars if len(node.chars) == 1 else char.in_(list(node.chars))
+    raise TypeError(f"Unknown condition node: {node!r}")
+
+
+def to_filters(node, model=StringRecord) -> list:
+    """``where(*filters)`` arguments for an optimized node."""
+    if node == TRUE:
+        return []
+    if isinstance(node, And):
+        return [to_sql(child, model) for child in node.children]
+    return [to_sql(node, model)]
+
+
+def plan_conditions(conditions: dict):
+    return optimize(lower_conditions(conditions))
+
+
+def filter_query_by_conditions(conditions: dict) -> list:
+    return to_filters(plan_conditions(conditions))
@@ -1,9 +1,15 @@
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine, AsyncSession
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from contextlib import asynccontextmanager
+from fastapi import Depends, Request
+import time
 
 from src.log import info_log, error_log
 from src.config import settings
 from src import model
+from src.string_analysis import mark_stats
 
 DB_URL = (
     f"postgresql+asyncpg://{settings.DB_USERNAME}:{settings.DB_PASSWORD}@"
@@ -11,11 +17,84 @@ DB_URL = (
 )
 
 
-async_engine = create_async_engine(DB_URL)
+class MeteredPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long callers wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": self.overflow(),
+            "max_overflow": self._max_overflow,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
+
+
+def make_engine(url: str):
+    return create_async_engine(
+        url,
+        poolclass=MeteredPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        # asyncpg's own per-connection cache and SQLAlchemy's prepared statement
+        # cache; set both to 0 behind pgbouncer in transaction mode.
+        connect_args={
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        },
+    )
+
+
+def make_session_maker(engine):
+    return async_sessionmaker(
+        bind=engine, autoflush=False, expire_on_commit=False, class_=AsyncSession
+    )
 
-AsyncSessionMaker = async_sessionmaker(
-    bind=async_engine, autoflush=False, expire_on_commit=False, class_=AsyncSession
-)
+
+async_engine = make_engine(DB_URL)
+AsyncSessionMaker = make_session_maker(async_engine)
+
+# Optional read replica for query endpoints; None routes all reads to the primary.
+replica_engine = make_engine(settings.DB_REPLICA_URL) if settings.DB_REPLICA_URL else None
+ReplicaSessionMaker = make_session_maker(replica_engine) if replica_engine else None
+
+# Set on responses to writes when READ_YOUR_WRITES_SECONDS is on, so that the
+# client's reads stay on the primary until the cookie expires.
+READ_PRIMARY_COOKIE = "read_primary"
+
+
+def pool_stats() -> dict:
+    stats = {"pool": async_engine.pool.stats()}
+    if replica_engine is not None:
+        stats["replica_pool"] = replica_engine.pool.stats()
+    return stats
 
 
 async def get_db():
@@ -23,11 +102,25 @@ async def get_db():
         yield async_session
 
 
+async def get_read_db(request: Request, db: AsyncSession = Depends(get_db)):
+    """Session for read-only queries: the replica if one is configured and
+    the client has not written recently, otherwise the primary session."""
+    if ReplicaSessionMaker is None or READ_PRIMARY_COOKIE in request.cookies:
+        yield db
+        return
+    async with ReplicaSessionMaker() as async_session:
+        yield async_session
+
+
 @asynccontextmanager
 async def db_lifepan():
     try:
         async with async_engine.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
             await conn.run_sync(model.Base.metadata.create_all)
+            # A new database's stats start exact; an existing one needs
+            # scripts.rebuild_stats first.
+            await conn.execute(mark_stats(only_if_empty=True))
             info_log.info("Connected to Database")
             yield
     except Exception:
@@ -35,4 +128,6 @@ async def db_lifepan():
         raise
     finally:
         await async_engine.dispose()
+        if replica_engine is not None:
+            await replica_engine.dispose()
         info_log.info("Disconnected from Database")
@@ -14,6 +14,15 @@ class StringNotFoundException(HTTPException):
 class UnparsableNaturalLanguageException(HTTPException):
     pass
 
+class InvalidBatchException(HTTPException):
+    pass
+
+class ImportNotFoundException(HTTPException):
+    pass
+
+class InvalidCursorException(HTTPException):
+    pass
+
 class InternalSystemError(HTTPException):  # renamed from SystemError
     pass
 
@@ -42,6 +51,24 @@ async def string_already_exists(request: Request, exc: StringAlreadyExistsExcept
         {"error": "String Already Exists", "detail": exc.detail},
     )
 
+async def invalid_batch(request: Request, exc: InvalidBatchException):
+    return await exc_handler(
+        exc.status_code,
+        {"error": "Invalid batch body", "detail": exc.detail},
+    )
+
+async def import_not_found(request: Request, exc: ImportNotFoundException):
+    return await exc_handler(
+        exc.status_code,
+        {"error": "Import Not Found", "detail": exc.detail},
+    )
+
+async def invalid_cursor(request: Request, exc: InvalidCursorException):
+    return await exc_handler(
+        exc.status_code,
+        {"error": "Invalid pagination cursor", "detail": exc.detail},
+    )
+
 async def string_not_found(request: Request, exc: StringNotFoundException):
     return await exc_handler(
         exc.status_code,
@@ -108,3 +135,6 @@ def register_exc(app: FastAPI):
     app.add_exception_handler(RequestValidationError, request_validation)
     app.add_exception_handler(StarletteHTTPException, starlette_validation)
     app.add_exception_handler(InternalSystemError, system_error)
+    app.add_exception_handler(InvalidBatchException, invalid_batch)
+    app.add_exception_handler(ImportNotFoundException, import_not_found)
+    app.add_exception_handler(InvalidCursorException, invalid_cursor)
@@ -77,7 +77,10 @@ class NLTransformer(Transformer):
             elif isinstance(item, str) and item in ["vowel", "vowels", "consonant", "consonants", "alphabet", "alphabets"]:
                 alpha_type = item
         
-        return {"type": "positional", "alpha": alpha_type, "position": position}
+        # "the 2nd vowel" puts the number first; "vowel at position 2nd" last
+        at_position = bool(items) and not isinstance(items[0], int)
+        return {"type": "positional", "alpha": alpha_type, "position": position,
+                "at_position": at_position}
     
     def positional_letter(self, items):
         """Parse positional letter patterns"""
@@ -90,7 +93,9 @@ class NLTransformer(Transformer):
             elif isinstance(item, str) and len(item) == 1 and item.isalpha():
                 letter = item
         
-        return {"type": "positional", "letter": letter, "position": position}
+        at_position = bool(items) and not isinstance(items[0], int)
+        return {"type": "positional", "letter": letter, "position": position,
+                "at_position": at_position}
     
     # Qualitative
     def qual_with_count(self, items):
@@ -142,7 +147,7 @@ class NLTransformer(Transformer):
                 "type": "compound",
                 "conditions": [
                     result,
-                    {"op": "and", "condition": {"type": "contains", "neg": False, "subtype": "positional", **positional_data}}
+                    {"op": "and", "condition": {**positional_data, "type": "contains", "neg": False, "subtype": "positional"}}
                 ]
             }
         elif count_value is not None:
@@ -241,8 +246,9 @@ class NLTransformer(Transformer):
         result = {"type": "contains", "neg": neg}
         
         if positional_data:
-            result["subtype"] = "positional"
             result.update(positional_data)
+            result["type"] = "contains"
+            result["subtype"] = "positional"
         elif number and keyword:
             field = "word_count" if keyword in ["word", "words"] else "length"
             result["subtype"] = "count"
@@ -16,4 +16,10 @@ console_handler.setFormatter(formatter)
 
 
 info_log.addHandler(console_handler)
-error_log.addHandler(console_handler)
\ No newline at end of file
+error_log.addHandler(console_handler)
+
+# One JSON line per traced request (see src.metrics.TimingMiddleware) and the
+# SQL / plan of slow queries.
+timing_log = logging.getLogger("app.timing")
+timing_log.setLevel(logging.INFO)
+timing_log.addHandler(console_handler)
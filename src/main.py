@@ -1,17 +1,44 @@
-from fastapi import FastAPI, Depends, status, Query, Response
+from fastapi import FastAPI, Depends, status, Query, Response, Request
+from fastapi.responses import StreamingResponse
 from contextlib import asynccontextmanager, AsyncExitStack
-from typing import Annotated, Optional
+from typing import Annotated, List, Literal, Optional, Union
 
-from src.db import db_lifepan
+from src.db import db_lifepan, pool_stats, READ_PRIMARY_COOKIE
+from src.config import settings
+from src.analyzer import analysis_pool_lifespan, string_id
 from src.log import info_log
-from src.schema import InsertString, ReturnString, ReturnStringList
-from src.string_service import StringAnalysis, get_string_analysis
+from src.metrics import TimingMiddleware, render_metrics, span
+from src.columnar import columnar_lifespan
+from src.schema import (
+    InsertString,
+    ReturnString,
+    ReturnStringList,
+    AggregateResult,
+    BatchInsertResult,
+    ImportProgress,
+    encode_string,
+    encode_string_list,
+    encode_aggregate,
+)
+from src.string_analysis import FACETS, decode_cursor, page_size
+from src.string_service import (
+    StringAnalysis,
+    get_string_analysis,
+    nl_query_cache,
+    string_cache,
+    parse_batch,
+    start_import,
+    import_progress,
+)
 from src.exc import (
     StringAlreadyExistsException,
     register_exc,
     StringNotFoundException,
     UnparsableNaturalLanguageException,
     InternalSystemError,
+    InvalidBatchException,
+    ImportNotFoundException,
+    InvalidCursorException,
 )
 
 
@@ -20,26 +47,127 @@ async def lifespan(app: FastAPI):
     info_log.info("Setting up start-ups")
     async with AsyncExitStack() as stack:
         await stack.enter_async_context(db_lifepan())
+        await stack.enter_async_context(analysis_pool_lifespan())
+        await stack.enter_async_context(columnar_lifespan())
         info_log.info("Start-ups Successfully Completed -- App is live now")
         yield
         info_log.info("Shutting down and cleaning up resources")
 
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(TimingMiddleware)
 register_exc(app)
 
 
 string_analysis = Annotated[StringAnalysis, Depends(get_string_analysis)]
 
 
-@app.get("/strings/filter-by-natural-language", response_model=ReturnStringList)
+@app.get("/metrics")
+async def get_metrics():
+    return Response(
+        content=render_metrics(), media_type="text/plain; version=0.0.4"
+    )
+
+
+@app.get("/db/stats")
+async def get_db_stats():
+    return pool_stats()
+
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    return {"nl_query": nl_query_cache.stats(), "string": string_cache.stats()}
+
+
+def read_cursor(cursor: Optional[str]):
+    if cursor is None:
+        return None
+    after = decode_cursor(cursor)
+    if after is None:
+        raise InvalidCursorException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use the next_cursor value returned by the previous page",
+        )
+    return after
+
+
+def json_response(content: bytes, status_code: int = status.HTTP_200_OK):
+    return Response(content=content, status_code=status_code, media_type="application/json")
+
+
+def mark_write(response: Response) -> Response:
+    """Pin the client's reads to the primary for READ_YOUR_WRITES_SECONDS."""
+    if settings.READ_YOUR_WRITES_SECONDS > 0:
+        response.set_cookie(
+            READ_PRIMARY_COOKIE,
+            "1",
+            max_age=max(1, round(settings.READ_YOUR_WRITES_SECONDS)),
+            httponly=True,
+        )
+    return response
+
+
+Mode = Literal["rows", "count", "exists", "facets"]
+Facet = Literal["length", "word_count", "unique_characters", "is_palindrome"]
+
+MODE_DESCRIPTION = (
+    "rows: a page of strings; count / exists / facets: only the number of "
+    "matches, whether any exist, or histograms of the facet properties"
+)
+
+
+def selected_facets(facet: Optional[List[str]]) -> list:
+    return list(dict.fromkeys(facet or FACETS))
+
+
+async def ndjson_lines(records):
+    async for record in records:
+        yield encode_string(record) + b"\n"
+
+
+def stream_response(records):
+    return StreamingResponse(ndjson_lines(records), media_type="application/x-ndjson")
+
+
+@app.get(
+    "/strings/filter-by-natural-language",
+    response_model=Union[ReturnStringList, AggregateResult],
+)
 async def get_string_by_nl(
     string_analysis: string_analysis,
     query: str = Query(..., desrciption="Natural language query"),
+    limit: Optional[int] = Query(None, ge=1, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    stream: bool = Query(False, description="Stream every match as NDJSON"),
+    mode: Mode = Query("rows", description=MODE_DESCRIPTION),
+    facet: Optional[List[Facet]] = Query(None, description="Facets for mode=facets (default all)"),
 ):
+    if mode != "rows":
+        result = await string_analysis.aggregate_natural_lang(
+            query.lower(), mode, selected_facets(facet)
+        )
+        if result is None:
+            raise UnparsableNaturalLanguageException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Unable to parse natural language query -- Bad query",
+            )
+        return json_response(encode_aggregate(result))
+
+    after = read_cursor(cursor)
+    limit = page_size(limit)
+    if stream:
+        records = string_analysis.stream_strings_from_natural_lang(query.lower(), after)
+        if records is None:
+            raise UnparsableNaturalLanguageException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Unable to parse natural language query -- Bad query",
+            )
+        return stream_response(records)
     try:
-        string = await string_analysis.get_strings_from_natural_lang(query.lower())
-        if not string:
+        page = await string_analysis.get_strings_from_natural_lang(
+            query.lower(), limit, after
+        )
+        if page is None or (not page[0] and after is None):
             raise UnparsableNaturalLanguageException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=(
@@ -47,9 +175,10 @@ async def get_string_by_nl(
                     "Bad query or String with such desrciption doesn't exist in the system"
                 ),
             )
-        return ReturnStringList(
-            return_list=[ReturnString(orm_string=s) for s in string]
-        )
+        string, next_cursor = page
+        with span("serialize"):
+            content = encode_string_list(string, next_cursor)
+        return json_response(content)
     except UnparsableNaturalLanguageException:
         raise
     except Exception as e:
@@ -59,7 +188,7 @@ async def get_string_by_nl(
         )
 
 
-@app.get("/strings", response_model=ReturnStringList)
+@app.get("/strings", response_model=Union[ReturnStringList, AggregateResult])
 async def get_string(
     string_analysis: string_analysis,
     length: Optional[int] = None,
@@ -76,8 +205,12 @@ async def get_string(
     endswith: Optional[str] = None,
     unique_characters: Optional[int] = None,
     is_palindrome: Optional[bool] = None,
+    limit: Optional[int] = Query(None, ge=1, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    stream: bool = Query(False, description="Stream every match as NDJSON"),
+    mode: Mode = Query("rows", description=MODE_DESCRIPTION),
+    facet: Optional[List[Facet]] = Query(None, description="Facets for mode=facets (default all)"),
 ):
-
     conditions = {
         "length": length,
         "min_length": min_length,
@@ -95,28 +228,57 @@ async def get_string(
         "is_palindrome": is_palindrome,
     }
 
-    string = await string_analysis.get_strings_by_condition(conditions)
-    if not string:
+    if mode != "rows":
+        result = await string_analysis.aggregate_by_condition(
+            conditions, mode, selected_facets(facet)
+        )
+        return json_response(encode_aggregate(result))
+
+    after = read_cursor(cursor)
+    limit = page_size(limit)
+
+    if stream:
+        return stream_response(
+            string_analysis.stream_strings_by_condition(conditions, after)
+        )
+
+    string, next_cursor = await string_analysis.get_strings_by_condition(
+        conditions, limit, after
+    )
+    if not string and after is None:
         raise StringNotFoundException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=(
                 "String Not Found. " "Register string to database by POST /strings"
             ),
         )
-    return ReturnStringList(return_list=[ReturnString(orm_string=s) for s in string])
+    with span("serialize"):
+        content = encode_string_list(string, next_cursor)
+    return json_response(content)
+
+
+@app.get("/strings/by-id/{sha256_hash}", response_model=ReturnString)
+async def get_string_by_id(sha256_hash: str, string_analysis: string_analysis):
+    payload = await string_analysis.get_string_payload(sha256_hash.lower())
+    if payload is None:
+        raise StringNotFoundException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No string with this sha256_hash",
+        )
+    return json_response(payload)
 
 
-@app.get("/strings/{string_value}")
+@app.get("/strings/{string_value}", response_model=ReturnString)
 async def get_string(string_value: str, string_analysis: string_analysis):
-    string = await string_analysis.get_string_by_value(string_value.lower())
-    if not string:
+    payload = await string_analysis.get_string_payload(string_id(string_value.lower()))
+    if payload is None:
         raise StringNotFoundException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=(
                 "String Not Found. " "Register string to database by POST /strings"
             ),
         )
-    return ReturnString(orm_string=string)
+    return json_response(payload)
 
 
 @app.post("/strings", status_code=status.HTTP_201_CREATED, response_model=ReturnString)
@@ -127,7 +289,55 @@ async def insert_new_string(strings: InsertString, string_analysis: string_analy
             status_code=status.HTTP_409_CONFLICT,
             detail="String Already Exists. Retrieve string from GET /strings/string_value",
         )
-    return ReturnString(orm_string=result)
+    return mark_write(json_response(encode_string(result), status.HTTP_201_CREATED))
+
+
+@app.post("/strings/batch", response_model=BatchInsertResult)
+async def insert_string_batch(
+    request: Request, response: Response, string_analysis: string_analysis
+):
+    strings = parse_batch(
+        await request.body(), request.headers.get("content-type", "")
+    )
+    if strings is None:
+        raise InvalidBatchException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=(
+                "Send a JSON array, or NDJSON with one item per line, "
+                "of strings or {\"value\": string} objects"
+            ),
+        )
+    created, duplicates = await string_analysis.insert_strings(strings)
+    mark_write(response)
+    return BatchInsertResult(
+        created=created,
+        duplicates=duplicates,
+        created_count=len(created),
+        duplicate_count=len(duplicates),
+    )
+
+
+@app.post("/strings/import", response_model=ImportProgress)
+async def import_strings(
+    request: Request,
+    response: Response,
+    string_analysis: string_analysis,
+    import_id: Optional[str] = None,
+):
+    progress = start_import(import_id)
+    mark_write(response)
+    return await string_analysis.import_stream(request.stream(), progress)
+
+
+@app.get("/imports/{import_id}", response_model=ImportProgress)
+async def get_import_progress(import_id: str):
+    progress = import_progress.get(import_id)
+    if progress is None:
+        raise ImportNotFoundException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No running or recent import with this id",
+        )
+    return progress
 
 
 @app.delete("/strings/{string_value}", status_code=status.HTTP_204_NO_CONTENT)
@@ -138,4 +348,4 @@ async def delete_string(string_value: str, string_analysis: string_analysis):
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Can't Be Deleted -- String doesn't exists in system",
         )
-    return Response(status_code=status.HTTP_204_NO_CONTENT)
+    return mark_write(Response(status_code=status.HTTP_204_NO_CONTENT))
@@ -0,0 +1,150 @@
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from src.log import timing_log
+
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """Cumulative-bucket histogram rendered in the Prometheus text format."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # label values -> [per-bucket counts, sum, count]
+        self._series: dict = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        counts = series[0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+                break
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            pairs = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, labels)]
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                le = ",".join(pairs + [f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{le}}} {cumulative}")
+            le = ",".join(pairs + ['le="+Inf"'])
+            lines.append(f"{self.name}_bucket{{{le}}} {count}")
+            selector = ",".join(pairs)
+            lines.append(f"{self.name}_sum{{{selector}}} {total}")
+            lines.append(f"{self.name}_count{{{selector}}} {count}")
+        return lines
+
+
+request_seconds = Histogram(
+    "string_api_request_duration_seconds",
+    "Time to handle a request, by route template, method and status.",
+    ("route", "method", "status"),
+)
+stage_seconds = Histogram(
+    "string_api_stage_duration_seconds",
+    "Time spent in each stage of a request (parse, build_filters, db, ...).",
+    ("route", "stage"),
+)
+
+
+def render_metrics() -> str:
+    return "\n".join(request_seconds.render() + stage_seconds.render()) + "\n"
+
+
+class Trace:
+    __slots__ = ("spans",)
+
+    def __init__(self):
+        self.spans: dict = {}
+
+
+_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+@contextmanager
+def span(stage: str):
+    """Time the enclosed block as ``stage`` of the current request, if any."""
+    trace = _trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        trace.spans[stage] = trace.spans.get(stage, 0.0) + elapsed
+
+
+class TimingMiddleware:
+    """ASGI middleware that opens a ``Trace`` per HTTP request, records the
+    request and its spans in the histograms, and logs requests that recorded
+    spans as one JSON line on ``timing_log``."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace()
+        token = _trace.set(trace)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _trace.reset(token)
+            # The route template, not the raw path, keeps label cardinality bounded.
+            route = scope.get("route")
+            route = route.path if route is not None else "unmatched"
+            request_seconds.observe(elapsed, route, scope["method"], str(status))
+            for stage, seconds in trace.spans.items():
+                stage_seconds.observe(seconds, route, stage)
+            if trace.spans:
+                timing_log.info(
+                    json.dumps(
+                        {
+                            "route": route,
+                            "method": scope["method"],
+                            "status": status,
+                            "total_ms": round(elapsed * 1000, 3),
+                            "spans_ms": {
+                                stage: round(seconds * 1000, 3)
+                                for stage, seconds in trace.spans.items()
+                            },
+                        }
+                    )
+                )
@@ -25,9 +25,11 @@ class StringRecord(Base):
         DateTime, nullable=False, server_default=func.now(), insert_default=func.now()
     )
 from sqlalchemy.orm import mapped_column, Mapped
-from sqlalchemy import String, Integer, DateTime, Boolean, JSON, func
+from sqlalchemy import String, Integer, BigInteger, DateTime, Boolean, JSON, ForeignKey, Index, func, literal_column
 from datetime import datetime
 
+from src.config import settings
+
 
 from sqlalchemy.orm import DeclarativeBase
 
@@ -41,12 +43,151 @@ class StringRecord(Base):
     __tablename__ = "string_analysis_record"
 
     id: Mapped[str] = mapped_column(String, primary_key=True, nullable=False)
-    value: Mapped[str] = mapped_column(String, unique=True, index=True, nullable=False)
+    # The primary key is sha256(value), so it already enforces uniqueness and
+    # serves point lookups; the wide unique btree on value is opt-in.
+    value: Mapped[str] = mapped_column(
+        String,
+        unique=settings.VALUE_UNIQUE_INDEX,
+        index=settings.VALUE_UNIQUE_INDEX,
+        nullable=False,
+    )
     length: Mapped[int] = mapped_column(Integer, nullable=False)
     is_palindrome: Mapped[bool] = mapped_column(Boolean, nullable=False)
     unique_characters: Mapped[int] = mapped_column(Integer, nullable=False)
     word_count: Mapped[int] = mapped_column(Integer, nullable=False)
     character_frequency_map: Mapped[dict] = mapped_column(JSON, nullable=False)
+    # Letter presence is answered from string_character_count; the mask only
+    # backs "contains letters". Having a vowel or consonant matches nearly
+    # every row, so the count indexes serve absence and count bounds.
+    letter_mask: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    vowel_count: Mapped[int] = mapped_column(
+        Integer, index=True, nullable=False, server_default="0"
+    )
+    consonant_count: Mapped[int] = mapped_column(
+        Integer, index=True, nullable=False, server_default="0"
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime, nullable=False, server_default=func.now(), insert_default=func.now()
     )
+
+
+# Keyset pagination order
+Index("ix_string_analysis_record_created_at_id", StringRecord.created_at, StringRecord.id)
+
+
+# Property filters as issued by GET /strings and the NL endpoint. word_count
+# filters are almost always combined with a length bound, and the composite
+# also serves word_count on its own. Palindromes are a small slice of the
+# table, so they get partial indexes for length bounds and for paging in
+# keyset order.
+Index("ix_string_analysis_record_length", StringRecord.length)
+Index("ix_string_analysis_record_unique_characters", StringRecord.unique_characters)
+Index(
+    "ix_string_analysis_record_word_count_length",
+    StringRecord.word_count,
+    StringRecord.length,
+)
+Index(
+    "ix_string_analysis_record_palindrome_length",
+    StringRecord.length,
+    postgresql_where=StringRecord.is_palindrome,
+)
+Index(
+    "ix_string_analysis_record_palindrome_created_at_id",
+    StringRecord.created_at,
+    StringRecord.id,
+    postgresql_where=StringRecord.is_palindrome,
+)
+
+
+# Substring indexes: trigram GIN for "contains", pattern-ops btrees on the
+# first / last VALUE_AFFIX_LENGTH characters for "startswith" / "endswith".
+# Only the affixes are indexed so long values stay under the btree row limit.
+# Needs pg_trgm.
+VALUE_AFFIX_LENGTH = 256
+
+value_head = func.left(StringRecord.value, literal_column(str(VALUE_AFFIX_LENGTH)))
+value_tail = func.left(
+    func.reverse(StringRecord.value), literal_column(str(VALUE_AFFIX_LENGTH))
+)
+
+Index(
+    "ix_string_analysis_record_value_trgm",
+    StringRecord.value,
+    postgresql_using="gin",
+    postgresql_ops={"value": "gin_trgm_ops"},
+)
+Index(
+    "ix_string_analysis_record_value_head",
+    value_head.label("value_head"),
+    postgresql_ops={"value_head": "text_pattern_ops"},
+)
+# Nested expressions are not traced back to their table, so attach explicitly.
+StringRecord.__table__.append_constraint(
+    Index(
+        "ix_string_analysis_record_value_tail",
+        value_tail.label("value_tail"),
+        postgresql_ops={"value_tail": "text_pattern_ops"},
+    )
+)
+
+
+class CharacterCount(Base):
+
+    __tablename__ = "string_character_count"
+    __table_args__ = (Index("ix_string_character_count_char_count", "char", "count"),)
+
+    string_id: Mapped[str] = mapped_column(
+        String, ForeignKey(StringRecord.id, ondelete="CASCADE"), primary_key=True
+    )
+    char: Mapped[str] = mapped_column(String(1), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class StringStats(Base):
+    """Number of stored strings per (length, word_count, unique_characters,
+    is_palindrome), updated in the same transaction as every insert and delete
+    so totals and facet histograms are answered without scanning
+    string_analysis_record."""
+
+    __tablename__ = "string_analysis_stats"
+
+    length: Mapped[int] = mapped_column(Integer, primary_key=True)
+    word_count: Mapped[int] = mapped_column(Integer, primary_key=True)
+    unique_characters: Mapped[int] = mapped_column(Integer, primary_key=True)
+    is_palindrome: Mapped[bool] = mapped_column(Boolean, primary_key=True)
+    count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+class StringStatsMarker(Base):
+    """Single row saying string_analysis_stats is exact. Written by
+    scripts.rebuild_stats, or at start-up while string_analysis_record is
+    still empty; until then aggregates never read the stats table."""
+
+    __tablename__ = "string_analysis_stats_marker"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    marked_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        nullable=False,
+        server_default=func.localtimestamp(),
+        insert_default=func.localtimestamp(),
+    )
+
+
+class DeletedString(Base):
+    """Strings deleted through the service while ``COLUMNAR_ENGINE`` is on,
+    so every worker's columnar engine drops them on its next refresh. Kept
+    for ``COLUMNAR_TOMBSTONE_SECONDS``."""
+
+    __tablename__ = "string_analysis_deleted"
+
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    deleted_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        index=True,
+        nullable=False,
+        server_default=func.localtimestamp(),
+        insert_default=func.localtimestamp(),
+    )
@@ -0,0 +1,120 @@
+import re
+
+
+_UNITS = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4,
+    "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9,
+}
+_TEENS = {
+    "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14,
+    "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19,
+}
+_TENS = {
+    "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50,
+    "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90,
+}
+_ORDINAL_UNITS = {
+    "first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5,
+    "sixth": 6, "seventh": 7, "eighth": 8, "ninth": 9,
+}
+_ORDINAL_TEENS = {
+    "tenth": 10, "eleventh": 11, "twelfth": 12, "thirteenth": 13, "fourteenth": 14,
+    "fifteenth": 15, "sixteenth": 16, "seventeenth": 17, "eighteenth": 18,
+    "nineteenth": 19,
+}
+_ORDINAL_TENS = {
+    "twentieth": 20, "thirtieth": 30, "fortieth": 40, "fiftieth": 50,
+    "sixtieth": 60, "seventieth": 70, "eightieth": 80, "ninetieth": 90,
+}
+
+# word -> (kind, value, is_ordinal)
+_WORDS = {}
+for _table, _kind, _ordinal in [
+    (_UNITS, "unit", False),
+    (_TEENS, "teen", False),
+    (_TENS, "tens", False),
+    (_ORDINAL_UNITS, "unit", True),
+    (_ORDINAL_TEENS, "teen", True),
+    (_ORDINAL_TENS, "tens", True),
+]:
+    for _word, _value in _table.items():
+        _WORDS[_word] = (_kind, _value, _ordinal)
+_WORDS["hundred"] = ("hundred", 100, False)
+_WORDS["hundredth"] = ("hundred", 100, True)
+# "a hundred"; an "a" not followed by "hundred" is left as it is.
+_WORDS["a"] = ("article", 1, False)
+
+# Which kind of number word may follow the previous one in a single number,
+# e.g. "two hundred" / "twenty one" / "one hundred twelve" / "eleven hundred".
+_NEXT = {
+    None: ("unit", "teen", "tens", "article"),
+    "article": ("hundred",),
+    "unit": ("hundred",),
+    "tens": ("unit", "hundred"),
+    "hundred": ("unit", "teen", "tens"),
+    "teen": ("hundred",),
+}
+
+_TOKEN = re.compile(r"[a-z]+|[\s-]+|[^a-z\s-]+")
+
+
+def _ordinal_suffix(value: int) -> str:
+    if value % 100 in (11, 12, 13):
+        return "th"
+    return {1: "st", 2: "nd", 3: "rd"}.get(value % 10, "th")
+
+
+def normalize_numbers(text: str) -> str:
+    """Rewrite English number words as digits in a single pass.
+
+    Cardinals become plain numbers ("twenty-one" -> "21", "two hundred" ->
+    "200") and ordinals keep a suffix ("first" -> "1st", "twenty third" ->
+    "23rd"), which is what the query grammar expects. "and" may join the
+    hundreds ("one hundred and five" -> "105"), and a "hundred" with no
+    number before it is left as it is. ``text`` must already be lower case.
+    """
+    out = []
+    value = 0
+    stage = None
+    gap = ""
+
+    def close():
+        nonlocal value, stage, gap
+        if stage is not None:
+            out.append("a" if stage == "article" else str(value))
+            stage = None
+            value = 0
+        out.append(gap)
+        gap = ""
+
+    for token in _TOKEN.findall(text):
+        word = _WORDS.get(token)
+        if word is None:
+            if stage is not None and not token.strip(" \t\n-"):
+                gap += token
+                continue
+            if stage == "hundred" and token == "and" and not gap.strip():
+                gap += token
+                continue
+            close()
+            out.append(token)
+            continue
+
+        kind, number, ordinal = word
+        if kind not in _NEXT[stage]:
+            close()
+            if kind == "hundred":
+                out.append(token)
+                continue
+        else:
+            gap = ""
+
+        value = value * 100 if kind == "hundred" else value + number
+        stage = kind
+        if ordinal:
+            out.append(f"{value}{_ordinal_suffix(value)}")
+            stage = None
+            value = 0
+
+    close()
+    return "".join(out)
@@ -1,4 +1,5 @@
 from pydantic import BaseModel, ConfigDict, Field, model_validator, field_validator
+from pydantic_core import to_json
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 
@@ -51,5 +52,70 @@ class ReturnString(BaseModel):
     
 class ReturnStringList(BaseModel):
     return_list: List[ReturnString]
+    next_cursor: Optional[str] = None
     
     model_config = ConfigDict(from_attributes=True)
+
+
+# --- Fast serialization ---
+# Same wire format as ReturnString / ReturnStringList, built straight from the
+# ORM rows and encoded by pydantic-core in one step, without validating every
+# row twice. The models above stay the documented response schema.
+
+def string_payload(record) -> dict:
+    return {
+        "id": record.id,
+        "value": record.value,
+        "properties": {
+            "length": record.length,
+            "is_palindrome": record.is_palindrome,
+            "unique_characters": record.unique_characters,
+            "word_count": record.word_count,
+            "sha256_hash": record.id,
+            "character_frequency_map": record.character_frequency_map,
+        },
+        "created_at": record.created_at,
+    }
+
+
+def encode_string(record) -> bytes:
+    return to_json(string_payload(record))
+
+
+def encode_string_list(records, next_cursor: Optional[str] = None) -> bytes:
+    return to_json(
+        {
+            "return_list": [string_payload(record) for record in records],
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+class AggregateResult(BaseModel):
+    """Response of the ``count``, ``exists`` and ``facets`` modes of the list
+    endpoints. ``facets`` maps each facet to ``{value: count}``."""
+    count: Optional[int] = None
+    exists: Optional[bool] = None
+    facets: Optional[Dict[str, Dict[str, int]]] = None
+
+
+def encode_aggregate(result: dict) -> bytes:
+    return to_json(result)
+
+
+class BatchInsertResult(BaseModel):
+    created: List[int]
+    duplicates: List[int]
+    created_count: int
+    duplicate_count: int
+
+
+class ImportProgress(BaseModel):
+    import_id: str
+    status: str = "running"
+    bytes_read: int = 0
+    lines_read: int = 0
+    created: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    chunks_written: int = 0
@@ -1,76 +1,18 @@
-from sqlalchemy import and_, or_, cast, Integer, select
-from src.model import StringRecord
-
-
-def filter_query_by_conditions(conditions: dict):
-    filters = []
-
-    # Boolean field
-    if conditions.get("is_palindrome") is True:
-        filters.append(StringRecord.is_palindrome.is_(True))
-
-    # Length filters
-    length = conditions.get("length")
-    min_length = conditions.get("min_length")
-    max_length = conditions.get("max_length")
-    if isinstance(length, int):
-        filters.append(StringRecord.length == length)
-    if isinstance(min_length, int):
-        filters.append(StringRecord.length >= min_length)
-    if isinstance(max_length, int):
-        filters.append(StringRecord.length <= max_length)
-
-    # Word count filters
-    word_count = conditions.get("word_count")
-    min_word_count = conditions.get("min_word_count")
-    max_word_count = conditions.get("max_word_count")
-    if isinstance(word_count, int):
-        filters.append(StringRecord.word_count == word_count)
-    if isinstance(min_word_count, int):
-        filters.append(StringRecord.word_count >= min_word_count)
-    if isinstance(max_word_count, int):
-        filters.append(StringRecord.word_count <= max_word_count)
-
-    # Contains / startswith / endswith
-    for key, pattern_func in [
-        ("contains_character", lambda s: f"%{s}%"),
-        ("startswith", lambda s: f"{s}%"),
-        ("endswith", lambda s: f"%{s}")
-    ]:
-        
-        v = conditions.get(key)
-        if v:
-            value = v.lower()
-            segs = segregate(value)
-            if segs:
-                sep, items = segs
-                conds = [StringRecord.value.ilike(pattern_func(item)) for item in items]
-                filters.append(or_(*conds) if sep == "," else and_(*conds))
-            else:
-                filters.append(StringRecord.value.ilike(pattern_func(value)))
-
-    # Character count filters (JSON field)
-    for key, operator in [
-        ("character_count", "exact"),
-        ("min_character_count", ">="),
-        ("max_character_count", "<=")
-    ]:
-        value = conditions.get(key)
-        if value:
-            segs = segregate(value)
-            if segs:
-                sep, items = segs
-                conds = []
-                for item in items:
-                    char, count = count_string(item)
-                    cond_expr = build_char_count_filter(char, count, operator)
-                    conds.append(cond_expr)
-                filters.append(or_(*conds) if sep == "," else and_(*conds))
-            else:
-                char, count = count_string(value)
-                filters.append(build_char_count_filter(char, count, operator))
-
-    return filters
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from sqlalchemy import BigInteger, and_, cast, literal, select, func, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from src.config import settings
+from src.model import (
+    StringRecord,
+    StringStats,
+    StringStatsMarker,
+    CharacterCount,
+    VALUE_AFFIX_LENGTH,
+    value_head,
+    value_tail,
+)
 
 
 def segregate(string: str):
@@ -94,27 +36,247 @@ def count_string(string: str):
     raise ValueError(f"Invalid character_count format: {string}")
 
 
-def build_char_count_filter(char, count, operator):
-    """Return SQLAlchemy filter for JSON character_frequency_map field."""
-    col = StringRecord.character_frequency_map[char].astext
-    col_int = cast(col, Integer)
-    if operator == "exact":
-        return StringRecord.character_frequency_map.contains({char: count})
-    elif operator == ">=":
-        return col_int >= count
-    elif operator == "<=":
-        return col_int <= count
+VOWELS = "aeiou"
+CONSONANTS = "bcdfghjklmnpqrstvwxyz"
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+def letter_mask(chars) -> int:
+    """Bit ``i`` is set when the ``i``-th letter of the alphabet is in ``chars``."""
+    mask = 0
+    for char in chars:
+        if char in LETTERS:
+            mask |= 1 << (ord(char) - 97)
+    return mask
+
+
+def char_class_chars(char_class: str) -> str:
+    if "vowel" in char_class:
+        return VOWELS
+    if "consonant" in char_class:
+        return CONSONANTS
+    return LETTERS
+
+
+# Values are stored lower-cased, so plain LIKE is exact. "contains" is served
+# by the trigram GIN index on value; "startswith" / "endswith" are anchored
+# LIKEs on left(value, 256) / left(reverse(value), 256), which the
+# text_pattern_ops head / tail btrees can use (ILIKE could use neither).
+def contains_filter(substring: str):
+    """Single characters hit the (char, count) index of the side table and
+    longer substrings the trigram index."""
+    if len(substring) == 1:
+        return build_char_count_filter(substring)
+    return StringRecord.value.like(f"%{substring}%")
+
+
+def startswith_filter(prefix: str):
+    """Match on the indexed head of value, rechecking the full value only
+    when the prefix is longer than the indexed part."""
+    condition = value_head.like(f"{prefix[:VALUE_AFFIX_LENGTH]}%")
+    if len(prefix) > VALUE_AFFIX_LENGTH:
+        condition = and_(condition, StringRecord.value.like(f"{prefix}%"))
+    return condition
+
+
+def endswith_filter(suffix: str):
+    """Prefix match on the indexed head of reverse(value)."""
+    reversed_suffix = suffix[::-1]
+    condition = value_tail.like(f"{reversed_suffix[:VALUE_AFFIX_LENGTH]}%")
+    if len(suffix) > VALUE_AFFIX_LENGTH:
+        condition = and_(condition, StringRecord.value.like(f"%{suffix}"))
+    return condition
+
+
+def build_char_count_filter(char, lo=1, hi=None):
+    """Return SQLAlchemy filter on the indexed (char, count) side table:
+    ``char`` occurs between ``lo`` and ``hi`` (None for no limit) times."""
+    conditions = [CharacterCount.char == char]
+    if lo is not None and lo == hi:
+        conditions.append(CharacterCount.count == lo)
     else:
-        raise ValueError(f"Unknown operator: {operator}")
+        if lo is not None and lo > 1:
+            conditions.append(CharacterCount.count >= lo)
+        if hi is not None:
+            conditions.append(CharacterCount.count <= hi)
+    return StringRecord.id.in_(
+        select(CharacterCount.string_id).where(*conditions)
+    )
+
+
+# Postgres caps a statement at 32767 bind parameters.
+MAX_BIND_PARAMS = 32767
+
+
+def value_batches(rows: list) -> list:
+    """Split the rows of a multi-row ``VALUES`` into slices whose parameters
+    fit in one statement."""
+    if not rows:
+        return []
+    size = MAX_BIND_PARAMS // len(rows[0])
+    return [rows[start : start + size] for start in range(0, len(rows), size)]
+
+
+# --- Keyset pagination on (created_at, id) ---
+
+def page_size(limit):
+    """Clamp a requested page size to the server maximum."""
+    return min(limit or settings.DEFAULT_PAGE_SIZE, settings.MAX_PAGE_SIZE)
+
+
+def encode_cursor(record) -> str:
+    payload = json.dumps([record.created_at.isoformat(), record.id])
+    return urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    """Return ``(created_at, id)`` from a cursor token, or None if it is invalid."""
+    try:
+        created_at, record_id = json.loads(urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), str(record_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def keyset(stmt, after=None):
+    """Order by (created_at, id), starting after the ``after`` key."""
+    if after is not None:
+        stmt = stmt.where(tuple_(StringRecord.created_at, StringRecord.id) > tuple_(*after))
+    return stmt.order_by(StringRecord.created_at, StringRecord.id)
+
+
+def paginate(stmt, limit: int, after=None):
+    """``keyset`` plus one extra row so the caller can tell whether another
+    page exists."""
+    return keyset(stmt, after).limit(limit + 1)
+
+
+def split_page(rows: list, limit: int):
+    """Return ``(page, next_cursor)`` from the ``limit + 1`` rows of ``paginate``."""
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    return rows, None
+
+
+# --- Aggregates over the rows a filtered statement selects ---
+
+FACETS = {
+    "length": StringRecord.length,
+    "word_count": StringRecord.word_count,
+    "unique_characters": StringRecord.unique_characters,
+    "is_palindrome": StringRecord.is_palindrome,
+}
+
+
+def _filtered(stmt, query):
+    return query if stmt.whereclause is None else query.where(stmt.whereclause)
+
+
+def count_query(stmt):
+    """``SELECT count(*)`` over the rows ``stmt`` selects."""
+    return _filtered(stmt, select(func.count()).select_from(StringRecord))
+
+
+def exists_query(stmt):
+    """``SELECT EXISTS (...)`` for the rows ``stmt`` selects."""
+    return select(_filtered(stmt, select(StringRecord.id)).exists())
+
+
+def _grouped(columns: list, measure):
+    """Group by each of ``columns`` plus the grand total, via ``GROUPING
+    SETS``. Each result row holds the column values, one ``grouping()`` flag
+    per column (0 for the column the row counts) and ``measure``."""
+    return select(
+        *columns, *(func.grouping(column) for column in columns), measure
+    ).group_by(func.grouping_sets(*(tuple_(column) for column in columns), tuple_()))
+
+
+def facets_query(stmt, facets: list):
+    """One scan computing the total and each facet histogram of the rows
+    ``stmt`` selects."""
+    columns = [FACETS[name] for name in facets]
+    return _filtered(stmt, _grouped(columns, func.count()).select_from(StringRecord))
+
+
+def split_facets(rows: list, facets: list):
+    """Return ``(total, {facet: {value: count}})`` from ``facets_query`` or
+    ``stats_facets_query`` rows."""
+    total = 0
+    histograms = {name: {} for name in facets}
+    width = len(facets)
+    for row in rows:
+        values, flags, count = row[:width], row[width : 2 * width], row[-1]
+        if all(flags):
+            total = count
+            continue
+        if count:
+            index = flags.index(0)
+            histograms[facets[index]][values[index]] = count
+    for name in facets:
+        histograms[name] = dict(sorted(histograms[name].items()))
+    return total, histograms
+
+
+# --- Statistics table ---
+
+STATS_COLUMNS = ("length", "word_count", "unique_characters", "is_palindrome")
+
+
+def stats_key(row: dict) -> tuple:
+    return tuple(row[name] for name in STATS_COLUMNS)
+
+
+def update_stats(deltas: dict) -> list:
+    """Upserts adding ``{stats_key: delta}`` to string_analysis_stats, one per
+    ``value_batches`` slice. Keys are written in sorted order so concurrent
+    writers lock rows in the same order and cannot deadlock."""
+    rows = [
+        dict(zip(STATS_COLUMNS, key), count=delta)
+        for key, delta in sorted(deltas.items())
+        if delta
+    ]
+    statements = []
+    for batch in value_batches(rows):
+        stmt = insert(StringStats).values(batch)
+        statements.append(
+            stmt.on_conflict_do_update(
+                index_elements=list(STATS_COLUMNS),
+                set_={"count": StringStats.count + stmt.excluded.count},
+            )
+        )
+    return statements
+
+
+def mark_stats(only_if_empty: bool = False):
+    """Insert (or refresh) the marker that lets aggregates read
+    string_analysis_stats. With ``only_if_empty`` it is only written while
+    string_analysis_record has no rows, so every row was counted."""
+    values = select(literal(1), func.localtimestamp())
+    if only_if_empty:
+        values = values.where(~select(StringRecord.id).exists())
+    stmt = insert(StringStatsMarker).from_select(["id", "marked_at"], values)
+    return stmt.on_conflict_do_update(
+        index_elements=[StringStatsMarker.id],
+        set_={"marked_at": stmt.excluded.marked_at},
+    )
+
+
+def stats_marked_query():
+    return select(select(StringStatsMarker.id).exists())
+
+
+def _stats_total():
+    # sum(bigint) is numeric in Postgres; cast back so counts stay integers.
+    return cast(func.coalesce(func.sum(StringStats.count), 0), BigInteger)
 
 
-# Usage in query
-async def get_filtered_strings(db, conditions: dict):
-    query = select(StringRecord)
-    filters = filter_query_by_conditions(conditions)
-    if filters:
-        query = query.where(and_(*filters))
-    result = await db.scalars(query)
-    return result.all()
+def stats_count_query(filters: list):
+    """``count_query`` answered from string_analysis_stats; ``filters`` must
+    only use its columns."""
+    return select(_stats_total()).where(*filters)
 
 
+def stats_facets_query(filters: list, facets: list):
+    """``facets_query`` answered from string_analysis_stats."""
+    columns = [getattr(StringStats, name) for name in facets]
+    return _grouped(columns, _stats_total()).where(*filters)
@@ -1,99 +1,662 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
-from sqlalchemy.exc import IntegrityError
-from typing import Annotated
-from fastapi import Depends
-from hashlib import sha256
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from typing import Annotated, AsyncIterator, Optional
+from fastapi import Depends, Request
+import sys
+import json
+import asyncio
+import time
 from collections import Counter
+from datetime import timedelta
+from uuid import uuid4
 from lark import Lark
+from lark.exceptions import LarkError
 
-from src.db import get_db
-from src.model import StringRecord
-from src.string_analysis import filter_query_by_conditions
+from src import columnar
+from src.db import get_db, get_read_db, READ_PRIMARY_COOKIE
+from src.cache import LRUCache, CacheBackend, MemoryBackend
+from src.config import settings
+from src.model import StringRecord, StringStats, CharacterCount, DeletedString
+from src.schema import ImportProgress, encode_string
+from src.conditions import FALSE, fields, lower_parsed, optimize, plan_conditions, to_filters
+from src.string_analysis import (
+    keyset,
+    paginate,
+    split_page,
+    count_query,
+    exists_query,
+    facets_query,
+    split_facets,
+    STATS_COLUMNS,
+    stats_key,
+    update_stats,
+    value_batches,
+    stats_count_query,
+    stats_facets_query,
+    stats_marked_query,
+)
+from src.analyzer import analyze, analyze_many, character_count_rows, string_id
 from src.lark_transformer import NLTransformer
 from src.lang_analysis import preprocess_query
-from src.lark_lang import lang
-from src.lang_analysis import build_filters
-from src.log import error_log
+from src.lark_lang import lang, lalr_lang
+from src.log import error_log, timing_log
+from src.metrics import span
 
 
 
 db = Annotated[AsyncSession, Depends(get_db)]
+read_db = Annotated[AsyncSession, Depends(get_read_db)]
 
 parser = Lark(lang, start="start", parser="earley")
+lalr_parser = Lark(lalr_lang, start="start", parser="lalr")
 transformer = NLTransformer()
 
 
+def parse_query(cleaned: str):
+    """Parse with the LALR grammar, falling back to Earley for inputs it rejects."""
+    try:
+        return lalr_parser.parse(cleaned)
+    except LarkError:
+        return parser.parse(cleaned)
+
+
+# A Select's clause objects take 10-25 bytes per character of the SQL they
+# compile to (measured with tracemalloc), so the SQL text is the estimate.
+STATEMENT_BYTES_PER_SQL_CHAR = 24
+
+
+def _plan_size(key: str, plan: tuple) -> int:
+    node, stmt = plan
+    compiled = stmt.compile()
+    return (
+        sys.getsizeof(key)
+        + sys.getsizeof(repr(node))
+        + len(compiled.string) * STATEMENT_BYTES_PER_SQL_CHAR
+        + sum(sys.getsizeof(value) for value in compiled.params.values())
+    )
+
+
+nl_query_cache = LRUCache(
+    max_entries=settings.NL_CACHE_MAX_ENTRIES,
+    ttl=settings.NL_CACHE_TTL_SECONDS,
+    max_bytes=settings.NL_CACHE_MAX_BYTES,
+    sizeof=_plan_size,
+)
+
+
+def compile_natural_lang(query: str):
+    """Return ``(condition, select_statement)`` for a query, where
+    ``condition`` is the optimized ``src.conditions`` tree, cached on the
+    whitespace/case-normalized text."""
+    key = " ".join(query.lower().split())
+    plan = nl_query_cache.get(key)
+    if plan is not None:
+        return plan
+
+    with span("preprocess"):
+        cleaned = preprocess_query(query)
+    with span("parse"):
+        tree = parse_query(cleaned)
+    with span("transform"):
+        parsed = transformer.transform(tree)
+    with span("build_filters"):
+        node = optimize(lower_parsed(parsed))
+        stmt = select(StringRecord).where(*to_filters(node))
+
+    plan = (node, stmt)
+    nl_query_cache.set(key, plan)
+    return plan
+
+
+string_cache: CacheBackend = MemoryBackend(
+    LRUCache(
+        max_entries=settings.STRING_CACHE_MAX_ENTRIES,
+        max_bytes=settings.STRING_CACHE_MAX_BYTES,
+    )
+)
+
+# Cached for lookups of strings that are not stored, so repeated misses skip
+# the database too. Kept short because another worker may insert the string.
+MISSING = b""
+
+
+def batch_item_value(item):
+    """Return the lower-cased string of a batch item, or None if it is invalid."""
+    value = item.get("value") if isinstance(item, dict) else item
+    return value.lower() if isinstance(value, str) else None
+
+
+def parse_batch(body: bytes, content_type: str):
+    """Return the lower-cased strings of a batch body, or None if it is invalid.
+
+    Accepts a JSON array, or NDJSON (one item per line) when ``content_type``
+    is ``application/x-ndjson``. Items are strings or ``{"value": ...}``.
+    """
+    try:
+        if "ndjson" in content_type:
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = json.loads(body)
+    except ValueError:
+        return None
+    if not isinstance(items, list):
+        return None
+
+    strings = [batch_item_value(item) for item in items]
+    if None in strings:
+        return None
+    return strings
+
+
+import_progress = LRUCache(max_entries=settings.IMPORT_PROGRESS_HISTORY)
+
+# Whether string_analysis_stats is marked exact, and when that was last
+# checked. Once marked it stays marked.
+stats_marker = {"marked": False, "checked_at": None}
+
+
+def start_import(import_id: Optional[str] = None) -> ImportProgress:
+    progress = ImportProgress(import_id=import_id or uuid4().hex)
+    import_progress.set(progress.import_id, progress)
+    return progress
+
+
+async def no_rows():
+    """Empty row stream for conditions the optimizer proved unsatisfiable."""
+    return
+    yield
+
+
 class StringAnalysis:
-    def __init__(self, db: AsyncSession):
+    """Writes go through ``db`` (the primary); queries go through ``read_db``,
+    which is a replica session or the same primary session. ``read_primary``
+    is set for clients holding the read-your-writes cookie, whose lookups
+    also skip ``string_cache``."""
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        read_db: Optional[AsyncSession] = None,
+        read_primary: bool = False,
+    ):
         self.db = db
+        self.read_db = db if read_db is None else read_db
+        self.read_primary = read_primary
 
     async def insert_string(self, string: str):
+        """Store ``string`` with one ``INSERT ... ON CONFLICT DO NOTHING
+        RETURNING`` and return the new record, or None if it already exists."""
+        string_data = await analyze(string)
 
-        string_data = {
-            "id": sha256(string.encode()).hexdigest(),
-            "value": string,
-            "length": len("".join(string.split(" "))),
-            "is_palindrome": (string.lower() == string[::-1].lower()),
-            "unique_characters": len(set(list(string))),
-            "word_count": len(string.split(" ")),
-            "character_frequency_map": dict(Counter(string)),
-        }
-
-        try:
-            string_model = StringRecord(**string_data)
-            self.db.add(string_model)
-            await self.db.commit()
-            await self.db.refresh(string_model)
-            return string_model
-        except IntegrityError as e:
+        string_model = await self.db.scalar(
+            insert(StringRecord)
+            .values(string_data)
+            .on_conflict_do_nothing(index_elements=[StringRecord.id])
+            .returning(StringRecord)
+        )
+        if string_model is None:
             await self.db.rollback()
-            print(f"IntegrityError: {str(e)}")
             return None
 
+        counts = character_count_rows(string_data)
+        if counts:
+            await self.db.execute(insert(CharacterCount), counts)
+        for stmt in update_stats({stats_key(string_data): 1}):
+            await self.db.execute(stmt)
+        await self.db.commit()
+        await string_cache.delete_many([string_model.id])
+        if columnar.engine is not None:
+            await columnar.engine.run(
+                columnar.engine.add_rows,
+                [{**string_data, "created_at": string_model.created_at}],
+            )
+        return string_model
+
+    async def insert_strings(self, strings: list):
+        """Analyze and store many strings, one multi-row
+        ``INSERT ... ON CONFLICT DO NOTHING RETURNING`` per chunk.
+
+        Returns ``(created, duplicates)`` as lists of indexes into ``strings``.
+        Repeats within ``strings`` count as duplicates of their first occurrence.
+        """
+        created, duplicates = [], []
+        pending = []
+        seen = set()
+        for index, string in enumerate(strings):
+            if string in seen:
+                duplicates.append(index)
+            else:
+                seen.add(string)
+                pending.append((index, string))
+
+        chunk_size = settings.BATCH_INSERT_CHUNK_SIZE
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start : start + chunk_size]
+            flags = await self._write_chunk([string for _, string in chunk])
+            for (index, _), was_created in zip(chunk, flags):
+                (created if was_created else duplicates).append(index)
+
+        return sorted(created), sorted(duplicates)
+
+    async def import_stream(self, body: AsyncIterator[bytes], progress: ImportProgress):
+        """Import an NDJSON byte stream without holding it in memory.
+
+        Lines are parsed into chunks of ``BATCH_INSERT_CHUNK_SIZE`` distinct
+        strings and handed to a writer task through a queue of at most
+        ``IMPORT_QUEUE_SIZE`` chunks, so reading the body pauses whenever the
+        database falls behind. Invalid lines are counted and skipped.
+        """
+        queue = asyncio.Queue(maxsize=settings.IMPORT_QUEUE_SIZE)
+
+        async def write():
+            error = None
+            while (chunk := await queue.get()) is not None:
+                if error is not None:
+                    continue
+                try:
+                    flags = await self._write_chunk(chunk)
+                except Exception as e:
+                    error = e
+                    progress.status = "failed"
+                    await self.db.rollback()
+                    continue
+                progress.created += sum(flags)
+                progress.duplicates += len(flags) - sum(flags)
+                progress.chunks_written += 1
+            if error is not None:
+                raise error
+
+        writer = asyncio.create_task(write())
+        chunk, seen = [], set()
+
+        def add_line(line: bytes):
+            nonlocal chunk, seen
+            if not line.strip():
+                return None
+            progress.lines_read += 1
+            try:
+                value = batch_item_value(json.loads(line))
+            except ValueError:
+                value = None
+            if value is None:
+                progress.invalid += 1
+            elif value in seen:
+                progress.duplicates += 1
+            else:
+                seen.add(value)
+                chunk.append(value)
+            if len(chunk) < settings.BATCH_INSERT_CHUNK_SIZE:
+                return None
+            full, chunk, seen = chunk, [], set()
+            return full
+
+        try:
+            buffer = bytearray()
+            async for data in body:
+                if progress.status == "failed":
+                    break
+                progress.bytes_read += len(data)
+                buffer += data
+                if b"\n" not in data:
+                    continue
+                *lines, rest = buffer.split(b"\n")
+                buffer = bytearray(rest)
+                for line in lines:
+                    if (full := add_line(line)) is not None:
+                        await queue.put(full)
+            if (full := add_line(buffer)) is not None:
+                await queue.put(full)
+            if chunk:
+                await queue.put(chunk)
+        finally:
+            await queue.put(None)
+            await writer
+
+        progress.status = "completed"
+        return progress
+
+    async def _write_chunk(self, strings: list) -> list:
+        """Insert distinct ``strings`` with multi-row statements (as few as the
+        bind parameter limit allows) and commit.
+
+        Returns one flag per string: True if created, False if it already existed.
+        """
+        rows = await analyze_many(strings)
+
+        inserted = {}
+        for batch in value_batches(rows):
+            result = await self.db.execute(
+                insert(StringRecord)
+                .values(batch)
+                .on_conflict_do_nothing(index_elements=[StringRecord.id])
+                .returning(StringRecord.id, StringRecord.created_at)
+            )
+            inserted.update(result.all())
+
+        counts = [
+            count
+            for row in rows
+            if row["id"] in inserted
+            for count in character_count_rows(row)
+        ]
+        if counts:
+            await self.db.execute(insert(CharacterCount), counts)
+        for stmt in update_stats(
+            Counter(stats_key(row) for row in rows if row["id"] in inserted)
+        ):
+            await self.db.execute(stmt)
+        await self.db.commit()
+        await string_cache.delete_many(inserted)
+        if columnar.engine is not None:
+            await columnar.engine.run(
+                columnar.engine.add_rows,
+                [
+                    {**row, "created_at": inserted[row["id"]]}
+                    for row in rows
+                    if row["id"] in inserted
+                ],
+            )
+
+        return [row["id"] in inserted for row in rows]
+
+    async def _query(self, stmt, scalars: bool = True) -> list:
+        """Run a read query as the request's ``db`` span, logging its SQL and
+        plan when it takes longer than ``SLOW_QUERY_SECONDS``. Returns the
+        first column of each row, or whole rows with ``scalars=False``."""
+        start = time.perf_counter()
+        with span("db"):
+            if scalars:
+                result = await self.read_db.scalars(stmt)
+            else:
+                result = await self.read_db.execute(stmt)
+            rows = result.all()
+        elapsed = time.perf_counter() - start
+        if settings.SLOW_QUERY_SECONDS is not None and elapsed >= settings.SLOW_QUERY_SECONDS:
+            await self._log_slow_query(stmt, elapsed)
+        return rows
+
+    async def _log_slow_query(self, stmt, elapsed: float):
+        """Log the SQL and its ``EXPLAIN ANALYZE`` plan. This runs the query a
+        second time, which is why it is opt-in."""
+        try:
+            sql = str(
+                stmt.compile(
+                    dialect=self.read_db.bind.dialect,
+                    compile_kwargs={"literal_binds": True},
+                )
+            )
+            conn = await self.read_db.connection()
+            plan = await conn.exec_driver_sql("EXPLAIN ANALYZE " + sql)
+            timing_log.warning(
+                json.dumps(
+                    {
+                        "slow_query_ms": round(elapsed * 1000, 3),
+                        "sql": sql,
+                        "plan": [row[0] for row in plan],
+                    }
+                )
+            )
+        except Exception:
+            error_log.error("Unable to explain slow query")
+
+    async def get_string_by_id(self, id: str):
+        rows = await self._query(select(StringRecord).where(StringRecord.id == id))
+        return rows[0] if rows else None
+
     async def get_string_by_value(self, value: str):
-        result = await self.db.scalars(
-            select(StringRecord).where(StringRecord.value == value)
-        )
-        return result.first()
+        return await self.get_string_by_id(string_id(value))
+
+    async def get_string_payload(self, id: str):
+        """Encoded response for the string with primary key ``id``, read
+        through ``string_cache``. Clients that have just written read the
+        primary instead, since the entry may predate their write."""
+        if not self.read_primary:
+            payload = await string_cache.get(id)
+            if payload is not None:
+                return payload or None
+
+        # Taken before the read so that an insert or delete committed while
+        # it runs keeps its result out of the cache.
+        generation = await string_cache.generation(id)
+        record = await self.get_string_by_id(id)
+        from_replica = self.read_db is not self.db
+        if record is None:
+            # The replica may not have a recent insert yet; caching the miss
+            # would serve it to every client.
+            if from_replica:
+                return None
+            await string_cache.set(
+                id,
+                MISSING,
+                ttl=settings.STRING_CACHE_NEGATIVE_TTL_SECONDS,
+                generation=generation,
+            )
+            return None
+
+        # A lagging replica can return a row the primary has already deleted,
+        # so entries read from it expire sooner.
+        ttl = settings.STRING_CACHE_TTL_SECONDS
+        if from_replica:
+            ttl = settings.STRING_CACHE_REPLICA_TTL_SECONDS
+        payload = encode_string(record)
+        await string_cache.set(id, payload, ttl=ttl, generation=generation)
+        return payload
+
+    async def _columnar_page(self, node, limit: int, after=None):
+        """Page of rows picked by the columnar engine, or None when it is off
+        or cannot evaluate ``node``. Matches are fetched by id; rows deleted
+        by another worker are skipped by asking for more."""
+        engine = columnar.engine
+        if engine is None:
+            return None
+        try:
+            predicate = columnar.compile_node(node)
+        except columnar.Unsupported:
+            return None
+
+        rows = []
+        while True:
+            wanted = limit + 1 - len(rows)
+            with span("columnar"):
+                keys = await engine.run(engine.select, predicate, wanted, after)
+            if keys:
+                rows += await self._query(
+                    select(StringRecord)
+                    .where(StringRecord.id.in_([record_id for _, record_id in keys]))
+                    .order_by(StringRecord.created_at, StringRecord.id)
+                )
+            if len(keys) < wanted or len(rows) > limit:
+                return split_page(rows, limit)
+            after = keys[-1]
+
+    async def get_strings_by_condition(self, conditions: dict, limit: int, after=None):
+        with span("build_filters"):
+            node = plan_conditions(conditions)
+        return await self._page(node, select(StringRecord).where(*to_filters(node)), limit, after)
+
+    async def _page(self, node, stmt, limit: int, after=None):
+        """One page of the rows ``stmt`` selects; ``node`` is its optimized
+        condition. Unsatisfiable conditions are answered without a query."""
+        if node == FALSE:
+            return [], None
+        page = await self._columnar_page(node, limit, after)
+        if page is not None:
+            return page
+        rows = await self._query(paginate(stmt, limit, after))
+        return split_page(rows, limit)
 
-    async def get_strings_by_condition(self, conditions: dict):
-        result = await self.db.scalars(
-            select(StringRecord).where(*filter_query_by_conditions(conditions))
+    async def _aggregate(self, node, stmt, mode: str, facets: list) -> dict:
+        """Answer ``count``, ``exists`` or ``facets`` for the rows ``stmt``
+        selects. Filters and facets on length, word_count, unique_characters
+        and is_palindrome only are answered from string_analysis_stats once
+        it is marked exact; otherwise from the
+        columnar engine when it can evaluate the condition, and otherwise
+        with one aggregate query. Unsatisfiable conditions need no query.
+
+        Columnar counts and facets, like columnar pages, see other workers'
+        inserts and deletes only after the next refresh."""
+        if node == FALSE:
+            if mode == "exists":
+                return {"exists": False}
+            if mode == "count":
+                return {"count": 0}
+            return {"count": 0, "facets": {name: {} for name in facets}}
+
+        stats_columns = set(STATS_COLUMNS)
+        if (
+            settings.STATS_AGGREGATES
+            and fields(node) <= stats_columns
+            and (mode != "facets" or set(facets) <= stats_columns)
+            and await self._stats_marked()
+        ):
+            filters = to_filters(node, StringStats)
+            if mode == "facets":
+                rows = await self._query(stats_facets_query(filters, facets), scalars=False)
+                total, histograms = split_facets(rows, facets)
+                return {"count": total, "facets": histograms}
+            total = (await self._query(stats_count_query(filters)))[0]
+            if mode == "exists":
+                return {"exists": total > 0}
+            return {"count": total}
+
+        if mode == "exists":
+            # A columnar match is confirmed by fetching it, since another
+            # worker may have deleted it since the last refresh.
+            page = await self._columnar_page(node, 1)
+            if page is not None:
+                return {"exists": bool(page[0])}
+            return {"exists": (await self._query(exists_query(stmt)))[0]}
+
+        engine = columnar.engine
+        if engine is not None:
+            try:
+                predicate = columnar.compile_node(node)
+            except columnar.Unsupported:
+                engine = None
+
+        if engine is not None:
+            with span("columnar"):
+                total, histograms = await engine.run(
+                    engine.aggregate, predicate, facets if mode == "facets" else ()
+                )
+        elif mode == "count":
+            total = (await self._query(count_query(stmt)))[0]
+        else:
+            rows = await self._query(facets_query(stmt, facets), scalars=False)
+            total, histograms = split_facets(rows, facets)
+
+        if mode == "count":
+            return {"count": total}
+        return {"count": total, "facets": histograms}
+
+    async def _stats_marked(self) -> bool:
+        if not stats_marker["marked"]:
+            checked_at = stats_marker["checked_at"]
+            now = time.monotonic()
+            if checked_at is None or now - checked_at >= settings.STATS_MARKER_RECHECK_SECONDS:
+                stats_marker["marked"] = (await self._query(stats_marked_query()))[0]
+                stats_marker["checked_at"] = now
+        return stats_marker["marked"]
+
+    async def aggregate_by_condition(self, conditions: dict, mode: str, facets: list) -> dict:
+        with span("build_filters"):
+            node = plan_conditions(conditions)
+        stmt = select(StringRecord).where(*to_filters(node))
+        return await self._aggregate(node, stmt, mode, facets)
+
+    def stream_strings_by_condition(self, conditions: dict, after=None):
+        node = plan_conditions(conditions)
+        if node == FALSE:
+            return no_rows()
+        stmt = select(StringRecord).where(*to_filters(node))
+        return self._stream(keyset(stmt, after))
+
+    async def _stream(self, stmt):
+        """Yield rows from a server-side cursor, ``STREAM_BATCH_SIZE`` at a time."""
+        result = await self.read_db.stream_scalars(
+            stmt.execution_options(yield_per=settings.STREAM_BATCH_SIZE)
         )
-        return result.all()
+        async for record in result:
+            yield record
 
     async def delete_strings_by_value(self, value: str):
+        id = string_id(value)
         result = await self.db.execute(
             delete(StringRecord)
-            .where(StringRecord.value == value)
+            .where(StringRecord.id == id)
+            .returning(
+                StringRecord.created_at,
+                *(getattr(StringRecord, name) for name in STATS_COLUMNS),
+            )
             .execution_options(synchronize_session=False)
         )
+        deleted = result.all()
+        if deleted:
+            removed = Counter(tuple(row[1:]) for row in deleted)
+            for stmt in update_stats({key: -count for key, count in removed.items()}):
+                await self.db.execute(stmt)
+            if settings.COLUMNAR_ENGINE:
+                await self._record_deletes(id, deleted)
         await self.db.commit()
-        return result.rowcount
+        await string_cache.delete_many([id])
+        if columnar.engine is not None:
+            for row in deleted:
+                await columnar.engine.run(columnar.engine.remove, row.created_at, id)
+        return len(deleted)
+
+    async def _record_deletes(self, id: str, deleted: list):
+        """Leave the deleted rows for the other workers' columnar refresh and
+        drop the entries every refresh has read by now."""
+        await self.db.execute(
+            insert(DeletedString).values(
+                [{"id": id, "created_at": row.created_at} for row in deleted]
+            ).on_conflict_do_nothing()
+        )
+        await self.db.execute(
+            delete(DeletedString).where(
+                DeletedString.deleted_at
+                < func.localtimestamp()
+                - timedelta(seconds=settings.COLUMNAR_TOMBSTONE_SECONDS)
+            )
+        )
 
-    async def get_strings_from_natural_lang(self, query: str):
+    async def get_strings_from_natural_lang(self, query: str, limit: int, after=None):
 
         try:
-            cleaned = preprocess_query(query)
-
-            tree = parser.parse(cleaned)
+            node, stmt = compile_natural_lang(query)
+            return await self._page(node, stmt, limit, after)
 
-            parsed = transformer.transform(tree)
+        except Exception:
+            error_log.error("Error countered while parsing --- Unable to Parse Request")
+            return None
 
-            filters = build_filters(parsed, StringRecord)
 
-            stmt = select(StringRecord)
-            if filters:
-                stmt = stmt.where(*filters)
+    async def aggregate_natural_lang(self, query: str, mode: str, facets: list):
+        """Like ``aggregate_by_condition`` for a natural language query;
+        returns None if it cannot be parsed."""
+        try:
+            node, stmt = compile_natural_lang(query)
+        except Exception:
+            error_log.error("Error countered while parsing --- Unable to Parse Request")
+            return None
+        return await self._aggregate(node, stmt, mode, facets)
 
-            results = await self.db.scalars(stmt)
-            return results.all()
+    def stream_strings_from_natural_lang(self, query: str, after=None):
+        """Like ``get_strings_from_natural_lang`` but unpaginated and streamed.
 
+        The query is compiled eagerly so a parse failure returns None before
+        any row is sent.
+        """
+        try:
+            node, stmt = compile_natural_lang(query)
         except Exception:
             error_log.error("Error countered while parsing --- Unable to Parse Request")
             return None
+        if node == FALSE:
+            return no_rows()
+        return self._stream(keyset(stmt, after))
 
 
-async def get_string_analysis(db: db):
-    return StringAnalysis(db)
+async def get_string_analysis(request: Request, db: db, read_db: read_db):
+    return StringAnalysis(db, read_db, READ_PRIMARY_COOKIE in request.cookies)
@@ -0,0 +1,11 @@
+import os
+
+# src.config requires the connection settings; the tests never connect.
+for name, value in [
+    ("DB_USERNAME", "test"),
+    ("DB_PASSWORD", "test"),
+    ("DB_HOST", "localhost"),
+    ("DB_PORT", "5432"),
+    ("DB_NAME", "test"),
+]:
+    os.environ.setdefault(name, value)
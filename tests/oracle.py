@@ -0,0 +1,53 @@
+"""Reference evaluation of ``src.conditions`` trees on analyzed rows.
+
+Written straight from the node definitions, without the optimizer, SQL or
+NumPy, so the tests can compare every other evaluation against it.
+"""
+
+from src.analyzer import analyze_string
+from src import conditions as c
+
+
+def row(value: str) -> dict:
+    return analyze_string(value)
+
+
+def matches(node, record: dict) -> bool:
+    if isinstance(node, c.Const):
+        return node.value
+    if isinstance(node, c.And):
+        return all(matches(child, record) for child in node.children)
+    if isinstance(node, c.Or):
+        return any(matches(child, record) for child in node.children)
+    if isinstance(node, c.Not):
+        return not matches(node.child, record)
+
+    value = record["value"]
+    if isinstance(node, c.Range):
+        if node.field == "letters":
+            actual = record["vowel_count"] + record["consonant_count"]
+        else:
+            actual = record[node.field]
+        return (node.lo is None or actual >= node.lo) and (
+            node.hi is None or actual <= node.hi
+        )
+    if isinstance(node, c.Flag):
+        return record[node.field]
+    if isinstance(node, c.CharCount):
+        count = record["character_frequency_map"].get(node.char, 0)
+        return count >= max(node.lo or 1, 1) and (node.hi is None or count <= node.hi)
+    if isinstance(node, c.Contains):
+        return node.substring in value
+    if isinstance(node, c.Prefix):
+        return value.startswith(node.prefix)
+    if isinstance(node, c.Suffix):
+        return value.endswith(node.suffix)
+    if isinstance(node, c.CharAt):
+        if node.position == -1:
+            char = value[-1:]
+        elif node.position >= 1:
+            char = value[node.position - 1 : node.position]
+        else:
+            char = ""
+        return char != "" and char in node.chars
+    raise TypeError(f"Unknown condition node: {node!r}")
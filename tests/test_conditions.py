@@ -0,0 +1,303 @@
+import random
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src.conditions import (
+    TRUE,
+    FALSE,
+    And,
+    Or,
+    Not,
+    Range,
+    Flag,
+    CharCount,
+    Contains,
+    Prefix,
+    Suffix,
+    CharAt,
+    lower_conditions,
+    lower_parsed,
+    optimize,
+    to_filters,
+)
+from src.lang_analysis import preprocess_query
+from src.lark_transformer import NLTransformer
+from src.string_analysis import CONSONANTS, VOWELS
+from tests.oracle import matches, row
+
+
+CORPUS = [
+    "", "a", "z", "ab", "ba", "abc", "aba", "abba", "noon", "level", "racecar",
+    "zz top", "a b", "b a b", "hello world", "queue", "xyz", "aeiou", "bcdfg",
+    "banana", "a.b", "!!", "ab ba", "e e e", "mississippi", "zebra", "oz",
+]
+ROWS = [row(value) for value in CORPUS]
+
+
+def nl(query: str):
+    from src.string_service import parse_query
+
+    return lower_parsed(NLTransformer().transform(parse_query(preprocess_query(query))))
+
+
+def assert_equivalent(before, after):
+    for record in ROWS:
+        assert matches(before, record) == matches(after, record), record["value"]
+
+
+# --- Range merging ---
+
+def test_and_intersects_ranges():
+    node = And((Range("length", lo=3), Range("length", lo=5), Range("length", hi=10)))
+    assert optimize(node) == Range("length", 5, 10)
+
+
+def test_and_of_disjoint_ranges_is_false():
+    assert optimize(And((Range("length", lo=6), Range("length", hi=4)))) == FALSE
+
+
+def test_ranges_are_clipped_to_the_field_minimum():
+    assert optimize(Range("word_count", lo=1)) == TRUE
+    assert optimize(Range("length", lo=0, hi=3)) == Range("length", hi=3)
+    assert optimize(Range("word_count", hi=0)) == FALSE
+    assert optimize(Range("length", hi=-1)) == FALSE
+
+
+def test_char_counts_intersect():
+    node = And((CharCount("a", lo=2), CharCount("a", hi=3), CharCount("a", lo=1)))
+    assert optimize(node) == CharCount("a", 2, 3)
+    assert optimize(And((CharCount("a", lo=3), CharCount("a", hi=2)))) == FALSE
+
+
+def test_length_bounds_other_requirements():
+    short = Range("length", hi=2)
+    assert optimize(And((short, Contains("abc")))) == FALSE
+    assert optimize(And((short, CharCount("a", lo=3)))) == FALSE
+    assert optimize(And((short, Range("letters", lo=4)))) == FALSE
+    assert optimize(And((short, Prefix("abc")))) == FALSE
+    # Spaces are not counted by length.
+    assert optimize(And((short, Contains("a b")))) != FALSE
+
+
+def test_affixes_and_positions_merge():
+    assert optimize(And((Prefix("a"), Prefix("ab")))) == Prefix("ab")
+    assert optimize(And((Prefix("ab"), Prefix("ac")))) == FALSE
+    assert optimize(And((Suffix("ba"), Suffix("a")))) == Suffix("ba")
+    assert optimize(And((Suffix("ab"), Suffix("cb")))) == FALSE
+    assert optimize(And((CharAt(2, "ab"), CharAt(2, "bc")))) == CharAt(2, "b")
+    assert optimize(And((CharAt(2, "a"), CharAt(2, "b")))) == FALSE
+
+
+# --- Or coalescing ---
+
+def test_or_coalesces_overlapping_and_adjacent_ranges():
+    assert optimize(Or((Range("length", 1, 3), Range("length", 4, 6)))) == Range("length", 1, 6)
+    assert optimize(Or((Range("length", 1, 4), Range("length", 3, 6)))) == Range("length", 1, 6)
+    assert optimize(Or((CharCount("a", 2, 2), CharCount("a", lo=3)))) == CharCount("a", lo=2)
+
+
+def test_or_keeps_ranges_with_a_gap():
+    node = Or((Range("length", 1, 3), Range("length", 5, 6)))
+    assert optimize(node) == node
+
+
+def test_or_covering_every_value_is_true():
+    assert optimize(Or((Range("length", lo=5), Range("length", hi=7)))) == TRUE
+
+
+# --- Not ---
+
+def test_not_is_pushed_through_range():
+    assert optimize(Not(Range("length", 3, 5))) == Or(
+        (Range("length", hi=2), Range("length", lo=6))
+    )
+    assert optimize(Not(Range("word_count", lo=2))) == Range("word_count", hi=1)
+    assert optimize(Not(Range("vowel_count", lo=1))) == Range("vowel_count", hi=0)
+
+
+def test_double_negation_cancels():
+    assert optimize(Not(Not(Flag("is_palindrome")))) == Flag("is_palindrome")
+
+
+def test_contradiction_and_tautology():
+    flag = Flag("is_palindrome")
+    assert optimize(And((flag, Not(flag)))) == FALSE
+    assert optimize(Or((flag, Not(flag)))) == TRUE
+
+
+# --- Constant folding ---
+
+def test_constants_fold():
+    flag = Flag("is_palindrome")
+    assert optimize(None) == TRUE
+    assert optimize(And((TRUE, flag))) == flag
+    assert optimize(Or((FALSE, flag))) == flag
+    assert optimize(And((FALSE, flag))) == FALSE
+    assert optimize(Or((TRUE, flag))) == TRUE
+    assert optimize(Not(TRUE)) == FALSE
+    assert optimize(Not(FALSE)) == TRUE
+    assert optimize(And(())) == TRUE
+    assert optimize(Or(())) == FALSE
+    assert optimize(Contains("")) == TRUE
+    assert optimize(CharAt(0, "a")) == FALSE
+
+
+def test_nested_and_or_are_flattened():
+    node = And((Flag("is_palindrome"), And((Range("length", lo=3), Contains("ab")))))
+    assert optimize(node) == And((Flag("is_palindrome"), Contains("ab"), Range("length", lo=3)))
+
+
+def test_conjuncts_are_ordered_by_selectivity():
+    node = optimize(And((Range("length", lo=3), CharCount("a"), Flag("is_palindrome"))))
+    assert node.children[0] == Flag("is_palindrome")
+    assert node.children[-1] == Range("length", lo=3)
+
+
+# --- Front ends ---
+
+def test_lower_conditions():
+    conditions = {"min_length": 3, "max_length": 8, "is_palindrome": True}
+    assert optimize(lower_conditions(conditions)) == And(
+        (Flag("is_palindrome"), Range("length", 3, 8))
+    )
+    assert optimize(lower_conditions({"word_count": 2})) == Range("word_count", 2, 2)
+    assert optimize(lower_conditions({"unique_characters": 3})) == Range(
+        "unique_characters", 3, 3
+    )
+    assert optimize(lower_conditions({})) == TRUE
+
+
+def test_lower_conditions_characters_and_substrings():
+    assert optimize(lower_conditions({"contains_character": "Z"})) == CharCount("z")
+    assert optimize(lower_conditions({"contains_character": "ab"})) == Contains("ab")
+    assert optimize(lower_conditions({"contains_character": "a,b"})) == Or(
+        (CharCount("a"), CharCount("b"))
+    )
+    assert optimize(lower_conditions({"startswith": "a,b"})) == Or((Prefix("a"), Prefix("b")))
+    assert optimize(lower_conditions({"endswith": "ing"})) == Suffix("ing")
+
+
+def test_lower_conditions_character_counts():
+    assert optimize(lower_conditions({"character_count": "a:2&b:1"})) == And(
+        (CharCount("a", 2, 2), CharCount("b", 1, 1))
+    )
+    assert optimize(lower_conditions({"min_character_count": "e:3"})) == CharCount("e", lo=3)
+    assert optimize(lower_conditions({"max_character_count": "e:2"})) == CharCount("e", 1, 2)
+    with pytest.raises(ValueError):
+        lower_conditions({"character_count": "a2"})
+
+
+def test_lower_parsed():
+    assert nl("strings longer than 10 characters") == Range("length", lo=11)
+    assert nl("strings between 3 and 7 characters") == Range("length", 3, 7)
+    assert optimize(nl("all single word palindromic strings")) == And(
+        (Flag("is_palindrome"), Range("word_count", hi=1))
+    )
+    assert nl("strings containing z or strings containing q") == Or(
+        (CharCount("z"), CharCount("q"))
+    )
+    assert nl("strings not containing b") == Not(CharCount("b"))
+    assert optimize(nl("strings without containing vowels")) == Range("vowel_count", hi=0)
+
+
+def test_lower_parsed_edge_cases():
+    def comparison(op, value):
+        return {"type": "comparison", "field": "length", "op": op, "value": value}
+
+    assert lower_parsed(comparison(">", None)) == FALSE
+    assert lower_parsed(comparison("!=", None)) == TRUE
+    assert lower_parsed(comparison("!=", 4)) == Not(Range("length", 4, 4))
+    assert lower_parsed({"type": "comparison", "field": "value", "op": ">", "value": 1}) is None
+    assert lower_parsed({"type": "unknown"}) is None
+    assert lower_parsed("strings") is None
+
+
+# --- SQL ---
+
+def sql(node) -> str:
+    return " AND ".join(
+        str(
+            clause.compile(
+                dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+            )
+        )
+        for clause in to_filters(node)
+    )
+
+
+def test_to_filters():
+    assert to_filters(TRUE) == []
+    assert sql(FALSE) == "false"
+    assert sql(Range("length", 3, 8)) == (
+        "string_analysis_record.length >= 3 AND string_analysis_record.length <= 8"
+    )
+    assert sql(Flag("is_palindrome")) == "string_analysis_record.is_palindrome"
+    assert "string_character_count.char = 'z'" in sql(CharCount("z"))
+
+
+# --- Random trees ---
+
+LEAVES = [
+    lambda r: Range(
+        r.choice(["length", "word_count", "unique_characters", "vowel_count", "consonant_count", "letters"]),
+        r.choice([None, 0, 1, 2, 3, 5]),
+        r.choice([None, 0, 1, 2, 4, 6]),
+    ),
+    lambda r: Flag("is_palindrome"),
+    lambda r: CharCount(r.choice("abez. "), r.choice([None, 1, 2, 3]), r.choice([None, 1, 2, 3])),
+    lambda r: Contains(r.choice(["", "a", "ab", "ba", "a b", "ss", "zz"])),
+    lambda r: Prefix(r.choice(["", "a", "ab", "b", "ze"])),
+    lambda r: Suffix(r.choice(["", "a", "ba", "n", "ppi"])),
+    lambda r: CharAt(r.choice([-1, 0, 1, 2, 3]), r.choice(["a", "b", "ab", VOWELS, CONSONANTS])),
+    lambda r: r.choice([TRUE, FALSE]),
+]
+
+
+def random_tree(r: random.Random, depth: int):
+    if depth == 0 or r.random() < 0.3:
+        return r.choice(LEAVES)(r)
+    kind = r.random()
+    if kind < 0.15:
+        return Not(random_tree(r, depth - 1))
+    children = tuple(random_tree(r, depth - 1) for _ in range(r.randint(1, 4)))
+    return And(children) if kind < 0.6 else Or(children)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_optimize_preserves_meaning(seed):
+    r = random.Random(seed)
+    for _ in range(100):
+        node = random_tree(r, 3)
+        assert_equivalent(node, optimize(node))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_optimize_is_idempotent(seed):
+    r = random.Random(seed)
+    for _ in range(100):
+        node = optimize(random_tree(r, 3))
+        assert optimize(node) == node
+
+
+def test_columnar_predicates_match():
+    np = pytest.importorskip("numpy")
+    from datetime import datetime
+
+    from src import columnar
+
+    engine = columnar.ColumnarEngine()
+    engine.add_rows([{**record, "created_at": datetime(2024, 1, 1)} for record in ROWS])
+    view = engine.store.view(0, engine.store.size)
+    r = random.Random(0)
+    checked = 0
+    for _ in range(500):
+        node = optimize(random_tree(r, 3))
+        try:
+            predicate = columnar.compile_node(node)
+        except columnar.Unsupported:
+            continue
+        mask = np.ones(len(ROWS), dtype=bool) if predicate is None else predicate(view)
+        assert mask.tolist() == [matches(node, record) for record in ROWS], node
+        checked += 1
+    assert checked > 50
@@ -0,0 +1,116 @@
+"""The LALR fast path must produce the same conditions as the Earley grammar.
+
+Every query in ``CORPUS`` goes through ``preprocess_query`` and both parsers.
+Queries the LALR grammar rejects are fine (they fall back to Earley), but any
+query it accepts must transform to exactly the Earley output.
+"""
+
+import pytest
+from lark import Lark
+from lark.exceptions import LarkError
+
+from src.lang_analysis import preprocess_query
+from src.lark_lang import lang, lalr_lang
+from src.lark_transformer import NLTransformer
+
+
+CORPUS = [
+    # head_only
+    "all strings",
+    "every text",
+    # qual_simple / qual_with_count
+    "palindromic strings",
+    "all single word palindromic strings",
+    "single word palindromic strings",
+    "double word palindromic strings",
+    "5 words palindromic",
+    "5 characters palindromic strings",
+    "palindromic 3 characters",
+    "palindromic single word strings",
+    "the symmetrical 2 words phrases",
+    # qual_with_verb
+    "palindromic strings with single word",
+    "palindromic strings with 3 words",
+    "palindromic strings that contain the first vowel",
+    "palindromic strings which have the last consonant",
+    "palindromic with the 2nd b strings",
+    "palindromic strings with b at position 3rd",
+    "mirror strings that include e in the 4th position",
+    # comparison_condition
+    "strings longer than 10 characters",
+    "all strings shorter than 4 words",
+    "strings at least 5 characters",
+    "strings at most 2 words",
+    "strings not longer than 7 characters",
+    "texts exactly 3 words",
+    "strings >= 6 characters",
+    "strings != 4",
+    "longer than 2 words",
+    # det_number_keyword_head
+    "5 characters long",
+    "all 5 characters long strings",
+    "the 3 words strings",
+    # element_condition
+    "strings containing letter z",
+    "strings containing z",
+    "strings that contain z",
+    "strings not containing b",
+    "strings without containing vowels",
+    "strings that have 3 words",
+    "strings containing the first vowel",
+    "strings that have the third c",
+    "strings containing the 2nd consonant",
+    "strings containing vowel at position 2nd",
+    "strings having b in the 3rd position",
+    "strings including alphabets",
+    # range_condition
+    "strings between 3 and 7 characters",
+    "all strings between 2 and 4 words",
+    "between 1 and 10",
+    # length_phrase
+    "strings of length greater than 5",
+    "strings with length at least 4 characters",
+    "strings of length <= 8",
+    "strings with length exactly 3",
+    # compound_condition
+    "palindromic strings and strings longer than 3 characters",
+    "strings containing z or strings containing q",
+    "single word palindromic strings but strings shorter than 5 characters",
+    "strings longer than 2 characters , strings containing the first vowel",
+    "strings with length greater than 3 and palindromic strings and strings containing x",
+    # numbers spelled out, handled by preprocess_query
+    "strings longer than ten characters",
+    "strings containing the second vowel",
+]
+
+
+@pytest.fixture(scope="module")
+def parsers():
+    return (
+        Lark(lang, start="start", parser="earley"),
+        Lark(lalr_lang, start="start", parser="lalr"),
+    )
+
+
+def _transform(parser: Lark, text: str):
+    try:
+        return NLTransformer().transform(parser.parse(text))
+    except LarkError:
+        return None
+
+
+@pytest.mark.parametrize("query", CORPUS)
+def test_lalr_matches_earley(parsers, query):
+    earley, lalr = parsers
+    cleaned = preprocess_query(query)
+    actual = _transform(lalr, cleaned)
+    if actual is None:
+        # Rejected by LALR: the service retries with Earley.
+        return
+    assert actual == _transform(earley, cleaned)
+
+
+def test_lalr_handles_most_of_the_corpus(parsers):
+    _, lalr = parsers
+    accepted = sum(_transform(lalr, preprocess_query(query)) is not None for query in CORPUS)
+    assert accepted >= len(CORPUS) * 0.9
@@ -0,0 +1,68 @@
+import pytest
+
+from src.number_words import normalize_numbers
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("five", "5"),
+        ("twenty-one", "21"),
+        ("ninety nine", "99"),
+        ("two hundred", "200"),
+        ("one hundred twelve", "112"),
+        ("one hundred and five", "105"),
+        ("a hundred", "100"),
+        ("a hundred and one", "101"),
+        ("eleven hundred", "1100"),
+        ("fifteen hundred", "1500"),
+        ("twenty hundred", "2000"),
+        ("twenty one hundred", "2100"),
+        ("one two", "1 2"),
+    ],
+)
+def test_cardinals(text, expected):
+    assert normalize_numbers(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("first", "1st"),
+        ("second", "2nd"),
+        ("third", "3rd"),
+        ("eleventh", "11th"),
+        ("twenty-third", "23rd"),
+        ("one hundredth", "100th"),
+        ("one hundred and first", "101st"),
+        ("one hundred twelfth", "112th"),
+    ],
+)
+def test_ordinals(text, expected):
+    assert normalize_numbers(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "hundred",
+        "hundreds of strings",
+        "strings containing a",
+        "a b",
+        "a palindrome",
+        "and then",
+    ],
+)
+def test_text_without_a_number_is_unchanged(text):
+    assert normalize_numbers(text) == text
+
+
+def test_numbers_inside_a_query():
+    assert normalize_numbers("strings longer than ten characters") == (
+        "strings longer than 10 characters"
+    )
+    assert normalize_numbers("strings with the second vowel and a hundred words") == (
+        "strings with the 2nd vowel and 100 words"
+    )
+    assert normalize_numbers("one hundred and strings") == "100 and strings"
+    assert normalize_numbers("strings with hundred words") == "strings with hundred words"
@@ -0,0 +1,157 @@
+"""Positional natural language conditions.
+
+"b at position 3rd" / "b in the 3rd position" test the character at that
+1-based position (counting spaces), "the 2nd b" / "the third consonant"
+require at least that many occurrences, and "the last a" tests the final
+character.
+"""
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src.conditions import (
+    And,
+    Not,
+    Range,
+    Flag,
+    CharCount,
+    Prefix,
+    Suffix,
+    CharAt,
+    lower_parsed,
+    optimize,
+    to_sql,
+)
+from src.lang_analysis import preprocess_query
+from src.lark_transformer import NLTransformer
+from src.string_analysis import CONSONANTS, VOWELS
+from tests.oracle import matches, row
+
+
+def nl(query: str):
+    from src.string_service import parse_query
+
+    return optimize(
+        lower_parsed(NLTransformer().transform(parse_query(preprocess_query(query))))
+    )
+
+
+def positional(**cond):
+    return lower_parsed({"type": "contains", "subtype": "positional", "neg": False, **cond})
+
+
+def selects(node, values) -> list:
+    return [value for value in values if matches(node, row(value))]
+
+
+def sql(node) -> str:
+    return str(
+        to_sql(node).compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+
+VALUES = ["", "b", "ab", "abb", "abba", "aab", "a b", "bob", "cbc", "banana", "acca", "eel"]
+
+
+# --- at_position ---
+
+@pytest.mark.parametrize(
+    "query",
+    ["strings having b in the 3rd position", "strings containing b at position 3rd"],
+)
+def test_letter_at_position(query):
+    node = nl(query)
+    assert node == CharAt(3, "b")
+    assert selects(node, VALUES) == ["abb", "abba", "aab", "a b", "bob"]
+
+
+def test_class_at_position():
+    node = nl("strings containing vowel at position 2nd")
+    assert node == CharAt(2, VOWELS)
+    assert selects(node, VALUES) == ["aab", "bob", "banana", "eel"]
+
+
+def test_positions_count_spaces():
+    assert selects(CharAt(2, CONSONANTS), ["a b", "abc"]) == ["abc"]
+    assert selects(CharAt(3, "b"), ["a b"]) == ["a b"]
+
+
+def test_first_position_is_a_prefix():
+    assert nl("strings having b in the 1st position") == Prefix("b")
+
+
+def test_position_combined_with_other_conditions():
+    assert nl("palindromic strings with b at position 3rd") == And(
+        (Flag("is_palindrome"), CharAt(3, "b"))
+    )
+
+
+def test_negated_position():
+    node = lower_parsed(
+        {
+            "type": "contains",
+            "subtype": "positional",
+            "alpha": "consonant",
+            "position": 2,
+            "at_position": True,
+            "neg": True,
+        }
+    )
+    assert node == Not(CharAt(2, CONSONANTS))
+    # Too short to have a second character counts as "not a consonant there".
+    assert selects(node, ["b", "ab", "ba"]) == ["b", "ba"]
+
+
+# --- Ordinals: at least that many occurrences ---
+
+def test_ordinal_letter():
+    assert nl("strings that have the third c") == CharCount("c", lo=3)
+    node = nl("strings that have the 2nd b")
+    assert node == CharCount("b", lo=2)
+    assert selects(node, VALUES) == ["abb", "abba", "bob"]
+
+
+def test_ordinal_class():
+    assert nl("strings containing the first vowel") == Range("vowel_count", lo=1)
+    node = nl("strings containing the 2nd consonant")
+    assert node == Range("consonant_count", lo=2)
+    assert selects(node, VALUES) == ["abb", "abba", "bob", "cbc", "banana", "acca"]
+
+
+def test_ordinal_without_at_position_is_a_count():
+    assert positional(letter="e", position=2) == CharCount("e", lo=2)
+    assert positional(alpha="alphabet", position=3) == Range("letters", lo=3)
+
+
+# --- last ---
+
+def test_last_letter_is_a_suffix():
+    node = nl("strings containing the last a")
+    assert node == Suffix("a")
+    assert selects(node, VALUES) == ["abba", "banana", "acca"]
+
+
+def test_last_class():
+    node = nl("palindromic strings which have the last consonant")
+    assert node == And((Flag("is_palindrome"), CharAt(-1, CONSONANTS)))
+    assert selects(CharAt(-1, CONSONANTS), VALUES) == [
+        "b", "ab", "abb", "aab", "a b", "bob", "cbc", "eel"
+    ]
+    assert positional(alpha="vowel", position=-1) == CharAt(-1, VOWELS)
+
+
+def test_incomplete_positional_is_ignored():
+    assert positional(position=2) is None
+    assert positional(letter="a") is None
+
+
+# --- SQL ---
+
+def test_char_at_sql():
+    assert sql(CharAt(3, "b")) == "substr(string_analysis_record.value, 3, 1) = 'b'"
+    assert sql(CharAt(2, "ab")) == (
+        "substr(string_analysis_record.value, 2, 1) IN ('a', 'b')"
+    )
+    assert sql(CharAt(-1, "ab")) == "right(string_analysis_record.value, 1) IN ('a', 'b')"
@@ -0,0 +1,192 @@
+"""The point-lookup cache must not outlive the writes it caches across.
+
+``FakeSession`` stands in for a database session: it answers the by-id lookup
+and the ``DELETE ... RETURNING`` of ``delete_strings_by_value``, and can hold a
+lookup between reading its row and returning it.
+"""
+
+import asyncio
+from collections import namedtuple
+from datetime import datetime
+
+import pytest
+
+from src.analyzer import analyze_string, string_id
+from src.cache import LRUCache, MemoryBackend
+from src.model import StringRecord
+from src.string_analysis import STATS_COLUMNS
+from src import string_service
+from src.string_service import MISSING, StringAnalysis
+
+
+Deleted = namedtuple("Deleted", ["created_at", *STATS_COLUMNS])
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    def __init__(self, *values):
+        self.records = {}
+        for value in values:
+            self.add(value)
+        self.gate = None
+
+    def add(self, value: str):
+        record = StringRecord(**analyze_string(value), created_at=datetime(2024, 1, 1))
+        self.records[record.id] = record
+
+    async def scalars(self, stmt):
+        record = self.records.get(stmt.whereclause.right.value)
+        if self.gate is not None:
+            await self.gate.wait()
+        return FakeResult([] if record is None else [record])
+
+    async def execute(self, stmt):
+        if not stmt.is_delete:
+            return FakeResult([])
+        record = self.records.pop(stmt.whereclause.right.value, None)
+        if record is None:
+            return FakeResult([])
+        return FakeResult(
+            [Deleted(record.created_at, *(getattr(record, name) for name in STATS_COLUMNS))]
+        )
+
+    async def commit(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    backend = MemoryBackend(LRUCache(max_entries=4))
+    monkeypatch.setattr(string_service, "string_cache", backend)
+    return backend
+
+
+def test_lookups_are_cached(cache):
+    async def run():
+        db = FakeSession("abc")
+        service = StringAnalysis(db)
+        assert await service.get_string_payload(string_id("abc")) is not None
+        db.records.clear()
+        assert await service.get_string_payload(string_id("abc")) is not None
+        assert await service.get_string_payload(string_id("xyz")) is None
+        assert await cache.get(string_id("xyz")) == MISSING
+
+    asyncio.run(run())
+
+
+def test_positive_entries_expire(cache, monkeypatch):
+    monkeypatch.setattr(string_service.settings, "STRING_CACHE_TTL_SECONDS", 60)
+
+    async def run():
+        await StringAnalysis(FakeSession("abc")).get_string_payload(string_id("abc"))
+
+    asyncio.run(run())
+    expires_at, _, _ = cache.cache._data[string_id("abc")]
+    assert expires_at is not None
+
+
+def test_read_racing_a_delete_is_not_cached(cache):
+    async def run():
+        db = FakeSession("abc")
+        service = StringAnalysis(db)
+        db.gate = asyncio.Event()
+        # The lookup reads the row, then the delete commits before it returns.
+        read = asyncio.create_task(service.get_string_payload(string_id("abc")))
+        await asyncio.sleep(0)
+        assert await service.delete_strings_by_value("abc") == 1
+        db.gate.set()
+        assert await read is not None
+
+        assert await cache.get(string_id("abc")) is None
+        assert await service.get_string_payload(string_id("abc")) is None
+
+    asyncio.run(run())
+
+
+def test_read_racing_an_insert_does_not_cache_missing(cache):
+    async def run():
+        db = FakeSession()
+        service = StringAnalysis(db)
+        db.gate = asyncio.Event()
+        read = asyncio.create_task(service.get_string_payload(string_id("abc")))
+        await asyncio.sleep(0)
+        db.add("abc")
+        await cache.delete_many([string_id("abc")])
+        db.gate.set()
+        assert await read is None
+
+        assert await service.get_string_payload(string_id("abc")) is not None
+
+    asyncio.run(run())
+
+
+def test_generation_survives_dropped_keys(cache):
+    async def run():
+        generation = await cache.generation("a")
+        await cache.delete_many(["a"])
+        # Push "a" out of the bounded generation table.
+        await cache.delete_many(["b", "c", "d", "e", "f"])
+        assert "a" not in cache.generations
+        await cache.set("a", b"stale", generation=generation)
+        assert await cache.get("a") is None
+
+        await cache.set("a", b"fresh", generation=await cache.generation("a"))
+        assert await cache.get("a") == b"fresh"
+
+    asyncio.run(run())
+
+
+# --- Read replica ---
+
+def test_replica_misses_are_not_cached(cache):
+    async def run():
+        service = StringAnalysis(FakeSession(), FakeSession())
+        assert await service.get_string_payload(string_id("abc")) is None
+        assert await cache.get(string_id("abc")) is None
+
+    asyncio.run(run())
+
+
+def test_read_primary_skips_replica_entries(cache):
+    async def run():
+        primary, replica = FakeSession("abc"), FakeSession("abc")
+        # Another client caches the row from the replica, which has not yet
+        # seen this client's delete.
+        await StringAnalysis(primary).delete_strings_by_value("abc")
+        await StringAnalysis(primary, replica).get_string_payload(string_id("abc"))
+        assert await cache.get(string_id("abc"))
+
+        sticky = StringAnalysis(primary, primary, read_primary=True)
+        assert await sticky.get_string_payload(string_id("abc")) is None
+
+        # And a miss cached before this client's insert.
+        await cache.set(string_id("xyz"), MISSING)
+        primary.add("xyz")
+        assert await sticky.get_string_payload(string_id("xyz")) is not None
+
+    asyncio.run(run())
+
+
+def test_read_primary_cookie():
+    from starlette.requests import Request
+
+    from src.db import READ_PRIMARY_COOKIE
+    from src.string_service import get_string_analysis
+
+    def request(cookie: bytes) -> Request:
+        return Request({"type": "http", "headers": [(b"cookie", cookie)] if cookie else []})
+
+    async def run():
+        db = FakeSession()
+        sticky = await get_string_analysis(request(f"{READ_PRIMARY_COOKIE}=1".encode()), db, db)
+        assert sticky.read_primary
+        assert not (await get_string_analysis(request(b""), db, db)).read_primary
+
+    asyncio.run(run())